@@ -1,505 +1,2700 @@
 import pandas as pd
-from sklearn.ensemble import IsolationForest
+import numpy as np
 import warnings
 import streamlit as st
 import os
+import re
+import json
+import math
+import shutil
+import hashlib
+import zlib
+import logging
+import argparse
+import sys
+import subprocess
+import sqlite3
+import tempfile
+import time
+import functools
+import contextvars
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import threading
+import uuid
+from collections import OrderedDict
 import io
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Functions run by process pools live in anomaly_core.py next to this script. Streamlit executes
+# the script as a new `__main__` module on every rerun, so functions defined here cannot be
+# pickled for a worker process. Loaders by path (tests, the `startup` command) need the
+# script's directory on sys.path to import it.
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if _SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, _SCRIPT_DIR)
+import anomaly_core
+from anomaly_core import compact_isolation_forest, fit_isolation_forest_batch
+
+# Load environment variables once per process (Streamlit re-executes this script on every rerun)
+@st.cache_resource(show_spinner=False)
+def _load_environment():
+    return load_dotenv()
+
+_load_environment()
 
 # Configure file paths
 DATA_DIR = os.getenv('DATA_DIR', 'data')
 DB_FILENAME = os.getenv('DB_FILENAME', 'Shot june2025-Parametric DB.xlsx')
 APPROVED_FILENAME = os.getenv('APPROVED_FILENAME', 'Approved Anomaly Values.xlsx')
 OUTPUT_DIR = os.getenv('OUTPUT_DIR', 'output')
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(DATA_DIR, '.cache'))
+INCREMENTAL_DIR = os.getenv('INCREMENTAL_DIR', os.path.join(CACHE_DIR, 'incremental'))
+APPROVED_STORE_FILE = os.getenv('APPROVED_STORE_FILE', os.path.join(DATA_DIR, 'approved_anomalies.sqlite'))
+UNIT_RULES_FILE = os.getenv('UNIT_RULES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'unit_rules.json'))
+
+# Isolation Forest scheduling: worker processes and target rows per batch of groups
+IF_WORKERS = int(os.getenv('IF_WORKERS', os.cpu_count() or 1))
+IF_BATCH_ROWS = int(os.getenv('IF_BATCH_ROWS', 50000))
+
+# Partitioned execution of full scans: 'off', or run the whole detection pipeline per shard of
+# PL_NAMEs on 'processes' (a local process pool), 'dask' or 'ray'. PARTITION_SHARDS=0 uses
+# four shards per worker so the pool stays busy when shard sizes differ.
+PARTITION_MODE = os.getenv('PARTITION_MODE', 'off')
+PARTITION_WORKERS = int(os.getenv('PARTITION_WORKERS', os.cpu_count() or 1))
+PARTITION_SHARDS = int(os.getenv('PARTITION_SHARDS', 0))
+
+# Numeric outlier detector per GROUP: 'isolation_forest', 'mad' or 'iqr'. With a robust
+# detector, groups with at least ISOLATION_FOREST_MIN_GROUP_SIZE values still use
+# Isolation Forest (0 disables Isolation Forest entirely for robust detectors).
+OUTLIER_DETECTOR = os.getenv('OUTLIER_DETECTOR', 'isolation_forest')
+ISOLATION_FOREST_MIN_GROUP_SIZE = int(os.getenv('ISOLATION_FOREST_MIN_GROUP_SIZE', 0))
+MAD_THRESHOLD = float(os.getenv('MAD_THRESHOLD', 3.5))
+IQR_MULTIPLIER = float(os.getenv('IQR_MULTIPLIER', 1.5))
+
+# Upload validation: 'sigma' compares values with 3 standard deviations around the DB mean of their
+# GROUP; 'isolation_forest' scores them with the per-GROUP models saved by the last full scan
+# (kept in MODEL_STORE_DIR for the MODEL_STORE_KEEP most recent DB versions)
+VALIDATION_SCORER = os.getenv('VALIDATION_SCORER', 'sigma')
+MODEL_STORE_DIR = os.getenv('MODEL_STORE_DIR', os.path.join(CACHE_DIR, 'models'))
+MODEL_STORE_KEEP = int(os.getenv('MODEL_STORE_KEEP', 3))
+
+# Columns of the parametric DB used by the detection and validation pipelines
+DB_COLUMNS = ['PL_NAME', 'FET_NAME', 'VALUE_ID', 'VALUE', 'UNIT']
+
+# Columns of the anomaly report returned by run_anomaly_detection()
+REPORT_COLUMNS = [
+    'PL_NAME',
+    'FET_NAME',
+    'VALUE_ID',
+    'VALUE',
+    'VALUE_NUMERIC',
+    'UNIT',
+    'Average',
+    'Median',
+    'GROUP',
+    'ANOMALY',
+    'ANOMALY_REASON'
+]
+
+# Streaming mode: 'auto' streams when the pipeline is estimated to exceed MEMORY_BUDGET_MB
+STREAMING_MODE = os.getenv('STREAMING_MODE', 'auto')
+MEMORY_BUDGET_MB = int(os.getenv('MEMORY_BUDGET_MB', 2048))
+
+# Result cache: scan results (memory and disk) and loaded DB frames (memory only), LRU-evicted
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', os.path.join(CACHE_DIR, 'results'))
+RESULT_CACHE_MEMORY_MB = int(os.getenv('RESULT_CACHE_MEMORY_MB', 512))
+RESULT_CACHE_DISK_MB = int(os.getenv('RESULT_CACHE_DISK_MB', 1024))
+
+# Query backend for loading and cleaning the DB and for the per-GROUP statistics: 'pandas' or
+# 'duckdb' (embedded and multi-threaded; spills to CACHE_DIR beyond MEMORY_BUDGET_MB; `pip install duckdb`)
+QUERY_BACKEND = os.getenv('QUERY_BACKEND', 'pandas')
+
+# Pipeline profiling: optional 'cprofile' or 'pyinstrument' dump next to each report
+PIPELINE_PROFILER = os.getenv('PIPELINE_PROFILER', '')
+
+# Benchmarks: stored baseline and the slowdown (as a fraction) tolerated before a stage counts as a regression
+BENCH_BASELINE_FILE = os.getenv('BENCH_BASELINE_FILE', 'bench_baseline.json')
+BENCH_TOLERANCE = float(os.getenv('BENCH_TOLERANCE', 0.25))
+
+# Background jobs: worker threads for scans/validations, where their results are kept and how
+# many finished jobs keep their files (older ones are deleted when a job is submitted; 0 keeps all)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOBS_DIR = os.getenv('JOBS_DIR', os.path.join(OUTPUT_DIR, 'jobs'))
+JOB_KEEP = int(os.getenv('JOB_KEEP', 50))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 2))
+
+# Startup: preload the DB, group statistics, unit rules and approved keys in a background thread
+# when the app starts ('on' or 'off'), and the budgets in seconds checked by the `startup` command
+STARTUP_PRELOAD = os.getenv('STARTUP_PRELOAD', 'on')
+STARTUP_IMPORT_BUDGET_S = float(os.getenv('STARTUP_IMPORT_BUDGET_S', 1.5))
+STARTUP_FIRST_INTERACTION_BUDGET_S = float(os.getenv('STARTUP_FIRST_INTERACTION_BUDGET_S', 1.0))
+
+# Result explorer: rows per page of the result tables shown in the app
+RESULT_PAGE_SIZE = int(os.getenv('RESULT_PAGE_SIZE', 50))
+
+# Create directories if they don't exist and suppress warnings, once per process
+@st.cache_resource(show_spinner=False)
+def _init_process():
+    os.makedirs(DATA_DIR, exist_ok=True)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    warnings.filterwarnings('ignore')
+    return True
+
+_init_process()
+
+# --- Columnar DB cache ---
+# The parametric workbook is converted once to Parquet and memory-mapped on later runs.
+# Object columns mixing text and numbers (e.g. VALUE) cannot be stored as one Parquet
+# column, so they are saved as text plus a per-cell type code and restored on load.
+_KIND_SUFFIX = '__kind'
+_KIND_NULL, _KIND_STR, _KIND_INT, _KIND_FLOAT, _KIND_BOOL, _KIND_OTHER = range(6)
+
+def _cell_kind(value):
+    if isinstance(value, str):
+        return _KIND_STR
+    if isinstance(value, (bool, np.bool_)):
+        return _KIND_BOOL
+    if isinstance(value, (int, np.integer)):
+        return _KIND_INT
+    if isinstance(value, (float, np.floating)):
+        return _KIND_NULL if np.isnan(value) else _KIND_FLOAT
+    if value is None or value is pd.NaT:
+        return _KIND_NULL
+    return _KIND_OTHER
+
+def _encode_mixed_columns(df):
+    """Split mixed-type object columns into text and type-code columns."""
+    encoded = {}
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == object:
+            kinds = values.map(_cell_kind).astype('int8')
+            if kinds.isin([_KIND_NULL, _KIND_STR]).all():
+                encoded[col] = values.where(kinds == _KIND_STR, None)
+            else:
+                encoded[col] = values.astype(str).where(kinds != _KIND_NULL, None)
+                encoded[col + _KIND_SUFFIX] = kinds
+        else:
+            encoded[col] = values
+    return pd.DataFrame(encoded, index=df.index)
+
+def _decode_mixed_columns(df):
+    """Rebuild mixed-type object columns written by `_encode_mixed_columns`."""
+    for kind_col in [c for c in df.columns if c.endswith(_KIND_SUFFIX)]:
+        col = kind_col[:-len(_KIND_SUFFIX)]
+        kinds = df[kind_col].to_numpy()
+        text = df[col].to_numpy(dtype=object)
+        values = np.full(len(df), np.nan, dtype=object)
+        for kind in (_KIND_STR, _KIND_OTHER):
+            values[kinds == kind] = text[kinds == kind]
+        values[kinds == _KIND_INT] = text[kinds == _KIND_INT].astype(np.int64)
+        values[kinds == _KIND_FLOAT] = text[kinds == _KIND_FLOAT].astype(np.float64)
+        values[kinds == _KIND_BOOL] = text[kinds == _KIND_BOOL] == 'True'
+        df[col] = values
+        df = df.drop(columns=[kind_col])
+    return df
+
+def _file_fingerprint(file_path, with_hash=False):
+    """Return the mtime/size (and optionally SHA-256) fingerprint of a file."""
+    stat = os.stat(file_path)
+    fingerprint = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+def _db_cache_paths(file_path):
+    """Return the Parquet and metadata paths of the cache for a source workbook."""
+    source_id = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:12]
+    base = os.path.join(CACHE_DIR, f"{Path(file_path).stem}-{source_id}")
+    return base + '.parquet', base + '.json'
+
+def _db_cache_is_fresh(file_path):
+    """Check the cache against the source workbook's mtime/size, falling back to its hash."""
+    cache_path, meta_path = _db_cache_paths(file_path)
+    if not (os.path.exists(cache_path) and os.path.exists(meta_path)):
+        return False
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    current = _file_fingerprint(file_path)
+    if current['mtime_ns'] == meta['mtime_ns'] and current['size'] == meta['size']:
+        return True
+    if current['size'] != meta['size']:
+        return False
+    # Same size but touched: only rebuild if the content actually changed
+    current = _file_fingerprint(file_path, with_hash=True)
+    if current['sha256'] != meta['sha256']:
+        return False
+    meta.update(current)
+    # Readers in other threads may open the metadata at any time, so never leave it half-written
+    tmp_path = f'{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+    return True
+
+@st.cache_resource(show_spinner=False)
+def _db_cache_locks():
+    """Process-wide lock per workbook, shared by sessions, job threads and the startup preload."""
+    return {'guard': threading.Lock(), 'locks': {}}
+
+def _db_cache_lock(file_path):
+    registry = _db_cache_locks()
+    with registry['guard']:
+        return registry['locks'].setdefault(os.path.abspath(file_path), threading.RLock())
+
+def ensure_db_cache(file_path):
+    """Build the columnar cache unless it is fresh. Returns True if this call built it.
+
+    Concurrent callers wait for a conversion already in progress instead of parsing the
+    workbook a second time.
+    """
+    if _db_cache_is_fresh(file_path):
+        return False
+    with _db_cache_lock(file_path):
+        if _db_cache_is_fresh(file_path):
+            return False
+        build_db_cache(file_path)
+        return True
+
+def build_db_cache(file_path):
+    """Convert the parametric workbook to the columnar Parquet cache."""
+    with _db_cache_lock(file_path):
+        return _build_db_cache(file_path)
+
+def _build_db_cache(file_path):
+    cache_path, meta_path = _db_cache_paths(file_path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fingerprint = _file_fingerprint(file_path, with_hash=True)
+    data = pd.read_excel(file_path)
+    # Write to temporary files first so concurrent readers never see a partial cache
+    tmp_suffix = f'.{os.getpid()}.{threading.get_ident()}.tmp'
+    _encode_mixed_columns(data).to_parquet(cache_path + tmp_suffix, engine='pyarrow', index=False)
+    with open(meta_path + tmp_suffix, 'w', encoding='utf-8') as f:
+        json.dump({**fingerprint, 'source': os.path.abspath(file_path), 'rows': len(data),
+                   'columns': [str(c) for c in data.columns]}, f)
+    os.replace(cache_path + tmp_suffix, cache_path)
+    os.replace(meta_path + tmp_suffix, meta_path)
+    return data
+
+def load_parametric_db(file_path, columns=None):
+    """Load the parametric DB from the columnar cache, rebuilding the cache when the workbook changed."""
+    ensure_db_cache(file_path)
+
+    cache_path, meta_path = _db_cache_paths(file_path)
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    available = meta['columns']
+    wanted = [c for c in (columns or available) if c in available]
+    frame_key = ('db', cache_path, meta['sha256'], tuple(wanted))
+    data = get_result_cache().get(frame_key)
+    if data is None:
+        data = read_db_parquet(cache_path, wanted)
+        get_result_cache().put(frame_key, data, persist=False)
+    return data
+
+def read_db_parquet(parquet_path, columns):
+    """Read DB columns from a Parquet file written with `_encode_mixed_columns`."""
+    import pyarrow.parquet as pq
+    schema_names = pq.read_schema(parquet_path).names
+    wanted = [c for c in columns if c in schema_names]
+    wanted += [c + _KIND_SUFFIX for c in wanted if c + _KIND_SUFFIX in schema_names]
+    # Plain-text name/unit columns are read dictionary-encoded, i.e. as categoricals
+    dictionary_columns = [c for c in CATEGORICAL_COLUMNS if c in wanted and c + _KIND_SUFFIX not in wanted]
+    data = pd.read_parquet(parquet_path, columns=wanted, engine='pyarrow', memory_map=True, read_dictionary=dictionary_columns)
+    return _decode_mixed_columns(data)
+
+# --- DuckDB query backend ---
+# With QUERY_BACKEND=duckdb the DB is filtered inside DuckDB, straight from the Parquet cache:
+# incomplete rows and approved anomalies are removed there, so only the rows the detection rules
+# need reach pandas, and the validation statistics are aggregated without loading the DB at all.
+# Approved keys are compared as '<kind>:<value>' strings in which DuckDB formats both sides'
+# numbers, so 5 matches 5.0 but the text '5' does not, exactly like approved_key_hashes.
+@functools.lru_cache(maxsize=1)
+def _import_duckdb():
+    """Return the duckdb module, or None (logged once) when it is not installed."""
+    try:
+        import duckdb
+        return duckdb
+    except ImportError:
+        logger.warning("QUERY_BACKEND=duckdb but duckdb is not installed; using pandas.")
+        return None
+
+def use_duckdb():
+    """Return True when the DuckDB backend is selected and available."""
+    return QUERY_BACKEND == 'duckdb' and _import_duckdb() is not None
+
+def _duckdb_connect():
+    """Open an in-process DuckDB connection limited to the memory budget, spilling to CACHE_DIR."""
+    spill_dir = os.path.join(CACHE_DIR, 'duckdb')
+    os.makedirs(spill_dir, exist_ok=True)
+    conn = _import_duckdb().connect()
+    conn.execute(f"SET memory_limit = '{MEMORY_BUDGET_MB}MB'")
+    conn.execute(f"SET temp_directory = '{spill_dir.replace(chr(39), chr(39) * 2)}'")
+    return conn
+
+def _sql_name(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _sql_to_double(text):
+    """SQL converting text to DOUBLE like pd.to_numeric(errors='coerce'): NULL when not a number."""
+    number = f"TRY_CAST({text} AS DOUBLE)"
+    return f"(CASE WHEN contains({text}, '_') OR isnan({number}) THEN NULL ELSE {number} END)"
+
+def _sql_column(schema, name, as_key):
+    """SQL for a cache column as an approved-key string (`as_key`) or as its numeric value."""
+    import pyarrow as pa
+    col = _sql_name(name)
+    if name + _KIND_SUFFIX in schema.names:
+        kind = _sql_name(name + _KIND_SUFFIX)
+        number = f"CAST({col} AS DOUBLE)"
+        boolean = f"CAST({col} = 'True' AS DOUBLE)"
+        if as_key:
+            return (f"(CASE {kind} WHEN {_KIND_STR} THEN 's:' || {col} WHEN {_KIND_OTHER} THEN 'o:' || {col} "
+                    f"WHEN {_KIND_BOOL} THEN 'n:' || CAST({boolean} AS VARCHAR) "
+                    f"WHEN {_KIND_INT} THEN 'n:' || CAST({number} AS VARCHAR) WHEN {_KIND_FLOAT} THEN 'n:' || CAST({number} AS VARCHAR) END)")
+        return (f"(CASE {kind} WHEN {_KIND_STR} THEN {_sql_to_double(col)} WHEN {_KIND_BOOL} THEN {boolean} "
+                f"WHEN {_KIND_INT} THEN {number} WHEN {_KIND_FLOAT} THEN {number} END)")
+    field_type = schema.field(name).type
+    if pa.types.is_dictionary(field_type):
+        field_type = field_type.value_type
+    if pa.types.is_string(field_type) or pa.types.is_large_string(field_type):
+        return f"('s:' || {col})" if as_key else _sql_to_double(col)
+    if pa.types.is_integer(field_type) or pa.types.is_floating(field_type) or pa.types.is_boolean(field_type):
+        return f"('n:' || CAST(CAST({col} AS DOUBLE) AS VARCHAR))" if as_key else f"CAST({col} AS DOUBLE)"
+    return f"('o:' || CAST({col} AS VARCHAR))" if as_key else "CAST(NULL AS DOUBLE)"
+
+def _approved_key_parts(approved):
+    """Split approved rows into kind/text/number columns per key column, dropping rows with a missing part."""
+    parts = {}
+    for col in APPROVED_KEY_COLUMNS:
+        kinds, texts, numbers = [], [], []
+        for value in approved[col]:
+            if isinstance(value, np.generic):
+                value = value.item()
+            if isinstance(value, str):
+                kind, text, number = 's', value, None
+            elif value is None or value is pd.NaT or (isinstance(value, float) and math.isnan(value)):
+                kind, text, number = None, None, None
+            elif isinstance(value, (bool, int, float)):
+                kind, text, number = 'n', None, float(value)
+            else:
+                kind, text, number = 'o', str(value), None
+            kinds.append(kind)
+            texts.append(text)
+            numbers.append(number)
+        parts[f'{col}_kind'] = pd.Series(kinds, dtype=object)
+        parts[f'{col}_text'] = pd.Series(texts, dtype=object)
+        parts[f'{col}_number'] = pd.Series(numbers, dtype=float)
+    return pd.DataFrame(parts).dropna(subset=[f'{col}_kind' for col in APPROVED_KEY_COLUMNS])
+
+def query_clean_db(file_path, approved):
+    """Load the DB rows that are complete and not approved anomalies through DuckDB.
+
+    Returns the rows, indexed by their position in the DB like the pandas path, and the
+    number of DB rows before filtering.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ensure_db_cache(file_path)
+    cache_path = _db_cache_paths(file_path)[0]
+    schema = pq.read_schema(cache_path)
+    columns = [c for c in DB_COLUMNS if c in schema.names]
+    selected = columns + [c + _KIND_SUFFIX for c in columns if c + _KIND_SUFFIX in schema.names]
+    complete = ' AND '.join(f'{_sql_name(c)} IS NOT NULL' for c in columns)
+    sql = (f"SELECT {', '.join(_sql_name(c) for c in selected)}, file_row_number FROM read_parquet(?, file_row_number = true) "
+           f"WHERE {complete}")
+
+    approved_parts = _approved_key_parts(approved)
+    conn = _duckdb_connect()
+    try:
+        if len(approved_parts) and all(c in schema.names for c in APPROVED_KEY_COLUMNS):
+            conn.register('approved_parts', approved_parts)
+            db_keys = ', '.join(f'{_sql_column(schema, c, as_key=True)} AS key_{i}' for i, c in enumerate(APPROVED_KEY_COLUMNS))
+            approved_keys = ', '.join(
+                f"{_sql_name(c + '_kind')} || ':' || coalesce({_sql_name(c + '_text')}, CAST({_sql_name(c + '_number')} AS VARCHAR)) AS key_{i}"
+                for i, c in enumerate(APPROVED_KEY_COLUMNS)
+            )
+            key_columns = ', '.join(f'key_{i}' for i in range(len(APPROVED_KEY_COLUMNS)))
+            sql = (f"SELECT * EXCLUDE ({key_columns}) FROM (SELECT *, {db_keys} FROM ({sql})) "
+                   f"ANTI JOIN (SELECT {approved_keys} FROM approved_parts) USING ({key_columns})")
+        table = conn.execute(f"{sql} ORDER BY file_row_number", [cache_path]).fetch_arrow_table()
+        total_rows = pq.ParquetFile(cache_path).metadata.num_rows
+    finally:
+        conn.close()
+
+    # Plain-text name/unit columns become categoricals, as when reading the cache with pandas
+    for name in CATEGORICAL_COLUMNS:
+        if name in table.column_names and name + _KIND_SUFFIX not in table.column_names and pa.types.is_string(table.schema.field(name).type):
+            table = table.set_column(table.column_names.index(name), name, table.column(name).dictionary_encode())
+    data = table.to_pandas()
+    data.index = pd.Index(data.pop('file_row_number').to_numpy(dtype=np.int64))
+    return _decode_mixed_columns(data), total_rows
+
+def query_group_stats(file_path):
+    """Compute the per-GROUP statistics index of the DB in DuckDB, like build_group_stats_index."""
+    import pyarrow.parquet as pq
+    ensure_db_cache(file_path)
+    cache_path = _db_cache_paths(file_path)[0]
+    schema = pq.read_schema(cache_path)
+    columns = [c for c in DB_COLUMNS if c in schema.names]
+    complete = ' AND '.join(f'{_sql_name(c)} IS NOT NULL' for c in columns)
+    sql = (
+        f"SELECT CAST(PL_NAME AS VARCHAR) || '_' || CAST(FET_NAME AS VARCHAR) AS \"GROUP\", "
+        # pandas gives no standard deviation for a group holding an infinite value; DuckDB would raise
+        f"avg(x) AS DB_MEAN, CASE WHEN bool_or(isinf(x)) THEN 'NaN'::DOUBLE "
+        f"ELSE stddev_samp(CASE WHEN isinf(x) THEN NULL ELSE x END) END AS DB_STD, count(x) AS DB_COUNT "
+        f"FROM (SELECT PL_NAME, FET_NAME, {_sql_column(schema, 'VALUE', as_key=False)} AS x "
+        f"FROM read_parquet(?) WHERE {complete}) GROUP BY 1 ORDER BY 1"
+    )
+    conn = _duckdb_connect()
+    try:
+        stats = conn.execute(sql, [cache_path]).fetch_df()
+    finally:
+        conn.close()
+    stats = stats.set_index('GROUP')
+    stats['DB_COUNT'] = stats['DB_COUNT'].astype(np.int64)
+    return stats
+
+# --- Result cache ---
+# Frames are kept in an in-process LRU (shared by all sessions) and, for scan results, as
+# Parquet files in RESULT_CACHE_DIR whose mtime serves as the LRU order across restarts.
+# Frames are copied on the way in and out, so callers may modify what they get.
+class ResultCache:
+    """Two-level LRU cache of DataFrames bounded by `memory_mb` and `disk_mb` (0 disables a level)."""
+
+    def __init__(self, directory=None, memory_mb=None, disk_mb=None):
+        self.directory = directory or RESULT_CACHE_DIR
+        self.memory_limit = (RESULT_CACHE_MEMORY_MB if memory_mb is None else memory_mb) * 1024 ** 2
+        self.disk_limit = (RESULT_CACHE_DISK_MB if disk_mb is None else disk_mb) * 1024 ** 2
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+
+    def _path(self, key):
+        digest = hashlib.sha256(json.dumps(key, default=str).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{digest}.parquet')
+
+    def get(self, key):
+        """Return a copy of the cached frame, or None."""
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key][0].copy()
+        path = self._path(key)
+        if self.disk_limit <= 0 or not os.path.exists(path):
+            return None
+        try:
+            data = _decode_mixed_columns(pd.read_parquet(path))
+            os.utime(path)
+        except Exception:
+            return None
+        self._remember(key, data)
+        return data.copy()
+
+    def put(self, key, data, persist=True):
+        """Cache a copy of `data`; `persist` also writes it to disk."""
+        self._remember(key, data.copy())
+        if persist and self.disk_limit > 0:
+            path = self._path(key)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                _encode_mixed_columns(data).to_parquet(tmp_path, index=True)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                # The disk level is an optimization only
+                logger.warning("Could not write result cache entry: %s", e)
+                return
+            self._evict_disk()
+
+    def _remember(self, key, data):
+        size = int(data.memory_usage(deep=True).sum())
+        if size > self.memory_limit:
+            return
+        with self.lock:
+            if key in self.memory:
+                self.memory_bytes -= self.memory.pop(key)[1]
+            self.memory[key] = (data, size)
+            self.memory_bytes += size
+            while self.memory_bytes > self.memory_limit:
+                self.memory_bytes -= self.memory.popitem(last=False)[1][1]
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.parquet'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Drop every cached frame from memory and disk."""
+        with self.lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.parquet'):
+                    os.remove(os.path.join(self.directory, name))
+
+@st.cache_resource
+def get_result_cache():
+    """Process-wide result cache shared by all sessions."""
+    return ResultCache()
+
+def _db_content_id(file_path):
+    """SHA-256 of the DB workbook, taken from the cache metadata when the cache is fresh."""
+    if _db_cache_is_fresh(file_path):
+        with open(_db_cache_paths(file_path)[1], encoding='utf-8') as f:
+            return json.load(f)['sha256']
+    return _file_fingerprint(file_path, with_hash=True)['sha256']
+
+def scan_cache_key(file_path, approved_keys):
+    """Key of a whole-DB scan: DB content, approved anomalies and detection settings."""
+    return (
+        'scan',
+        _db_content_id(file_path),
+        hashlib.sha1(np.ascontiguousarray(approved_keys).tobytes()).hexdigest(),
+        _detection_config_fingerprint(),
+    )
+
+# --- Unit rule engine ---
+def compile_unit_rules(valid_units):
+    """Case-fold and deduplicate the valid-unit rules into a compiled rule set.
+
+    Categories differing only in case are merged. Per-FET_NAME matchers are built
+    lazily and memoized in the rule set, so they are compiled once per FET_NAME.
+    """
+    categories = {}
+    for key, units in valid_units.items():
+        categories.setdefault(key.lower(), set()).update(unit.lower() for unit in units)
+    return {'categories': categories, 'matchers': {}}
+
+def _unit_matcher(rules, fet_name):
+    """Return one regex matching any unit allowed for a FET_NAME, or None if no category applies."""
+    fet_lower = str(fet_name).lower()
+    if fet_lower in rules['matchers']:
+        return rules['matchers'][fet_lower]
+    allowed = set()
+    for key, units in rules['categories'].items():
+        if key in fet_lower:  # Match FET_NAME to valid unit types (partial match)
+            allowed |= units
+    matcher = None
+    if allowed:
+        matcher = re.compile('|'.join(re.escape(unit) for unit in sorted(allowed, key=len, reverse=True)))
+    rules['matchers'][fet_lower] = matcher
+    return matcher
+
+def _merge_duplicate_rules(pairs):
+    """JSON object hook that unions the units of repeated keys instead of dropping them."""
+    merged = {}
+    for key, units in pairs:
+        merged.setdefault(key, []).extend(units)
+    return merged
+
+def load_unit_rules(rules_path=None):
+    """Load and compile the valid-unit rules from a JSON or YAML file."""
+    rules_path = rules_path or UNIT_RULES_FILE
+    with open(rules_path, encoding='utf-8') as f:
+        if Path(rules_path).suffix.lower() in ('.yaml', '.yml'):
+            import yaml
+            valid_units = yaml.safe_load(f)
+        else:
+            valid_units = json.load(f, object_pairs_hook=_merge_duplicate_rules)
+    return compile_unit_rules(valid_units)
+
+@st.cache_resource
+def _unit_rule_registry():
+    """Process-wide holder for the compiled unit rules, shared by all sessions and reruns."""
+    return {}
+
+def reload_unit_rules():
+    """Reload the unit rules file into the shared registry."""
+    registry = _unit_rule_registry()
+    mtime_ns = os.stat(UNIT_RULES_FILE).st_mtime_ns
+    registry.update(rules=load_unit_rules(UNIT_RULES_FILE), path=UNIT_RULES_FILE, mtime_ns=mtime_ns)
+    return registry['rules']
+
+def get_unit_rules():
+    """Return the shared compiled unit rules, reloading them if the rules file changed."""
+    registry = _unit_rule_registry()
+    if registry.get('path') != UNIT_RULES_FILE or registry.get('mtime_ns') != os.stat(UNIT_RULES_FILE).st_mtime_ns:
+        return reload_unit_rules()
+    return registry['rules']
+
+def find_invalid_units(df, unit_col, fet_name_col, rules):
+    """Flag rows whose unit is not valid for their FET_NAME.
+
+    Each distinct (FET_NAME, UNIT) pair is checked once and the result is broadcast
+    back to the rows, so the cost grows with the number of distinct pairs, not rows.
+    """
+    fet_codes, fet_names = pd.factorize(df[fet_name_col].astype(str))
+    unit_codes, units = pd.factorize(df[unit_col])  # Missing units get code -1
+    stride = len(units) + 1
+    pair_codes, pairs = pd.factorize(fet_codes.astype(np.int64) * stride + unit_codes + 1)
+    matchers = [_unit_matcher(rules, name) for name in fet_names]
+    valid = np.zeros(len(pairs), dtype=bool)
+    for i, pair in enumerate(pairs):
+        fet_code, unit_code = divmod(int(pair), stride)
+        matcher = matchers[fet_code]
+        if matcher is None or unit_code == 0:  # No matching category or missing unit
+            continue
+        unit_parts = str(units[unit_code - 1]).lower().split('|')  # Split compound units
+        valid[i] = any(matcher.search(part.strip()) for part in unit_parts)
+    return pd.Series(~valid[pair_codes], index=df.index)
+
+# --- Isolation Forest scheduler ---
+def score_groups_isolation_forest(values, group_codes, workers=None, batch_rows=None, models=None):
+    """Run Isolation Forest separately for every group and return a row-aligned anomaly mask.
+
+    Groups are bucketed into batches of roughly `batch_rows` rows, largest groups first,
+    and the batches are fitted on a process pool by `anomaly_core.fit_isolation_forest_batch`.
+    Every group is fitted with the same `random_state`, so the result does not depend on the
+    batching or worker count.
+    If `models` is a dict, the compact model of every fitted group is added under its group code.
+    """
+    workers = IF_WORKERS if workers is None else workers
+    batch_rows = batch_rows or IF_BATCH_ROWS
+    anomaly_mask = np.zeros(len(values), dtype=bool)
+
+    # Stable sort keeps the original row order inside each group
+    order = np.argsort(group_codes, kind='stable')
+    sorted_values = np.asarray(values, dtype=float)[order]
+    sorted_codes = np.asarray(group_codes)[order]
+    starts = np.flatnonzero(np.r_[True, np.diff(sorted_codes) != 0]) if len(order) else np.array([], dtype=int)
+    sizes = np.diff(np.r_[starts, len(order)])
+
+    # Only groups with more than one numeric value can be scored
+    batches, batch_positions, current, current_rows = [], [], [], 0
+    for g in np.argsort(-sizes, kind='stable'):
+        if sizes[g] < 2:
+            break
+        current.append(g)
+        current_rows += sizes[g]
+        if current_rows >= batch_rows:
+            batches.append(current)
+            current, current_rows = [], 0
+    if current:
+        batches.append(current)
+
+    payloads = []
+    for batch in batches:
+        payloads.append([sorted_values[starts[g]:starts[g] + sizes[g]] for g in batch])
+        batch_positions.append(np.concatenate([order[starts[g]:starts[g] + sizes[g]] for g in batch]))
+
+    fit_batch = functools.partial(fit_isolation_forest_batch, keep_models=models is not None)
+    if workers > 1 and len(payloads) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(payloads))) as executor:
+            results = list(executor.map(fit_batch, payloads))
+    else:
+        results = [fit_batch(payload) for payload in payloads]
+
+    # Scatter the per-batch masks back to row positions in one pass
+    if results:
+        anomaly_mask[np.concatenate(batch_positions)] = np.concatenate([mask for mask, _ in results])
+    if models is not None:
+        for batch, (_, batch_models) in zip(batches, results):
+            models.update((sorted_codes[starts[g]], model) for g, model in zip(batch, batch_models))
+    return anomaly_mask
+
+# --- Isolation Forest model store ---
+# With one feature, every tree of a forest splits the value axis at its thresholds, so the
+# forest's prediction is constant between consecutive thresholds of all its trees. A fitted
+# GROUP model is therefore stored exactly as the sorted boundaries where the prediction flips
+# and the outlier label of each interval (`compact_isolation_forest`, run in the Isolation Forest
+# workers and therefore kept in anomaly_core.py). Full scans save these per DB version and detection
+# settings in shards, so upload validation loads only the shards of the GROUPs it needs.
+GROUP_MODEL_FORMAT_VERSION = 1
+GROUP_MODEL_SHARD_GROUPS = 2000
+
+def predict_group_model(values, boundaries, labels):
+    """Return the outlier mask of `values` under a compact GROUP model, as the forest would predict it."""
+    values = np.asarray(values, dtype=np.float32).astype(np.float64)
+    return labels[np.searchsorted(boundaries, values, side='left')]
+
+def group_model_set_id(file_path):
+    """Name of the model set for the current content of a DB and the current detection settings."""
+    return hashlib.sha1(f'{_db_content_id(file_path)}-{_detection_config_fingerprint()}'.encode('utf-8')).hexdigest()[:20]
+
+def _group_model_shard(name, shards):
+    return zlib.crc32(str(name).encode('utf-8')) % shards
+
+def save_group_models(set_id, group_models, store_dir=None):
+    """Save {GROUP: (boundaries, labels)} as the model set `set_id`, replacing an older copy."""
+    store_dir = store_dir or MODEL_STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+    names = sorted(group_models)
+    shards = max(1, math.ceil(len(names) / GROUP_MODEL_SHARD_GROUPS))
+    by_shard = {}
+    for name in names:
+        by_shard.setdefault(_group_model_shard(name, shards), []).append(name)
+
+    # Write to a temporary directory first so readers never see a partial set
+    tmp_dir = tempfile.mkdtemp(prefix=f'{set_id}.', suffix='.tmp', dir=store_dir)
+    for shard_id, shard_names in by_shard.items():
+        boundaries = [group_models[name][0] for name in shard_names]
+        np.savez(
+            os.path.join(tmp_dir, f'shard-{shard_id:05d}.npz'),
+            groups=np.array(shard_names, dtype=str),
+            offsets=np.cumsum([0] + [len(b) for b in boundaries]),
+            boundaries=np.concatenate(boundaries),
+            labels=np.concatenate([group_models[name][1] for name in shard_names]),
+        )
+    import sklearn
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'format_version': GROUP_MODEL_FORMAT_VERSION, 'created': datetime.now().isoformat(timespec='seconds'),
+            'sklearn': sklearn.__version__, 'groups': len(names), 'shards': shards,
+        }, f)
+
+    target = os.path.join(store_dir, set_id)
+    old_dir = f'{target}.{os.getpid()}.old'
+    if os.path.exists(target):
+        os.replace(target, old_dir)
+    os.replace(tmp_dir, target)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    # Keep the most recent sets only
+    sets = [os.path.join(store_dir, d) for d in os.listdir(store_dir) if os.path.exists(os.path.join(store_dir, d, 'manifest.json'))]
+    for path in sorted(sets, key=os.path.getmtime, reverse=True)[MODEL_STORE_KEEP:]:
+        shutil.rmtree(path, ignore_errors=True)
+    return target
+
+@functools.lru_cache(maxsize=64)
+def _load_group_model_shard(path, mtime_ns):
+    """Read one shard into {GROUP: (boundaries, labels)}; the mtime makes a replaced set reload."""
+    with np.load(path, allow_pickle=False) as shard:
+        groups, offsets = shard['groups'], shard['offsets']
+        boundaries, labels = shard['boundaries'], shard['labels']
+    # Every group has one more label than boundaries
+    return {
+        str(name): (boundaries[offsets[i]:offsets[i + 1]], labels[offsets[i] + i:offsets[i + 1] + i + 1])
+        for i, name in enumerate(groups)
+    }
+
+class GroupModelSet:
+    """The per-GROUP models of one full scan, loaded shard by shard on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+    def load(self, names):
+        """Return {GROUP: (boundaries, labels)} for the given GROUPs that have a model."""
+        shards = self.manifest['shards']
+        wanted = {}
+        for name in names:
+            wanted.setdefault(_group_model_shard(name, shards), []).append(str(name))
+        models = {}
+        for shard_id, shard_names in wanted.items():
+            path = os.path.join(self.path, f'shard-{shard_id:05d}.npz')
+            if not os.path.exists(path):
+                continue
+            shard = _load_group_model_shard(path, os.stat(path).st_mtime_ns)
+            models.update((name, shard[name]) for name in shard_names if name in shard)
+        return models
+
+def open_group_model_set(set_id, store_dir=None):
+    """Open a saved model set, or return None if it does not exist or has an older format."""
+    path = os.path.join(store_dir or MODEL_STORE_DIR, set_id)
+    try:
+        model_set = GroupModelSet(path)
+    except (OSError, ValueError):
+        return None
+    return model_set if model_set.manifest.get('format_version') == GROUP_MODEL_FORMAT_VERSION else None
+
+# --- Robust 1-D outlier detectors ---
+def mad_outliers(values, group_codes):
+    """Flag values whose robust z-score (median/MAD) within their group exceeds MAD_THRESHOLD."""
+    values = pd.Series(values, dtype=float)
+    median = values.groupby(group_codes).transform('median')
+    abs_dev = (values - median).abs()
+    by_group = abs_dev.groupby(group_codes)
+    mad = by_group.transform('median') * 1.4826
+    # MAD is zero when most values are identical; fall back to the mean absolute deviation
+    scale = mad.where(mad > 0, by_group.transform('mean') * 1.2533)
+    return ((scale > 0) & (abs_dev > MAD_THRESHOLD * scale)).to_numpy()
+
+def iqr_outliers(values, group_codes):
+    """Flag values outside the Tukey fences (Q1 - k*IQR, Q3 + k*IQR) of their group."""
+    values = pd.Series(values, dtype=float)
+    by_group = values.groupby(group_codes)
+    q1 = by_group.transform('quantile', 0.25)
+    q3 = by_group.transform('quantile', 0.75)
+    spread = IQR_MULTIPLIER * (q3 - q1)
+    return ((values < q1 - spread) | (values > q3 + spread)).to_numpy()
+
+# Detector name -> (function(values, group_codes) -> row mask, anomaly reason)
+OUTLIER_DETECTORS = {
+    'isolation_forest': (score_groups_isolation_forest, 'Isolation Forest anomaly detected'),
+    'mad': (mad_outliers, 'Robust (MAD) outlier detected'),
+    'iqr': (iqr_outliers, 'Robust (IQR) outlier detected'),
+}
+OUTLIER_REASONS = [reason for _, reason in OUTLIER_DETECTORS.values()]
+
+# --- Anomaly reason flags ---
+# Reasons are kept as one bit per rule while the pipelines run and rendered to text
+# only for the rows of the final report. The list order is the order of the report text.
+ANOMALY_REASONS = [
+    'Invalid unit for measurement',
+    *OUTLIER_REASONS,
+    'PL majority is numeric but value is non-numeric',
+    'PL majority is non-numeric but value is numeric',
+    'Non-numeric value without allowed characters',
+    'Outlier compared to database',
+    'Group not found in database',
+]
+REASON_FLAGS = {reason: np.uint16(1 << bit) for bit, reason in enumerate(ANOMALY_REASONS)}
+OUTLIER_FLAGS = [REASON_FLAGS[reason] for reason in OUTLIER_REASONS]
+
+def add_reason_flag(flags, mask, reason):
+    """Set the bit of `reason` in the uint16 flags column wherever `mask` is True."""
+    return flags | np.where(np.asarray(mask, dtype=bool), REASON_FLAGS[reason], np.uint16(0)).astype(np.uint16)
+
+def render_anomaly_reasons(flags, empty_text):
+    """Render reason flags as the '; '-joined reason text, once per distinct flag combination."""
+    codes, uniques = pd.factorize(np.asarray(flags, dtype=np.uint16))
+    texts = [
+        '; '.join(reason for reason in ANOMALY_REASONS if int(value) & int(REASON_FLAGS[reason])) or empty_text
+        for value in uniques
+    ]
+    return np.array(texts, dtype=object)[codes] if len(codes) else np.array([], dtype=object)
+
+# --- Compact columns ---
+# Name and unit columns repeat heavily, so they are held as categoricals
+CATEGORICAL_COLUMNS = ['PL_NAME', 'FET_NAME', 'UNIT']
 
-# Create directories if they don't exist
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+def build_group_column(pl_names, fet_names):
+    """Build GROUP ('<PL_NAME>_<FET_NAME>') as a categorical, formatting each distinct pair only once."""
+    pl_codes, pl_uniques = pd.factorize(pl_names)
+    fet_codes, fet_uniques = pd.factorize(fet_names)
+    stride = max(len(fet_uniques), 1)
+    pair_codes, pairs = pd.factorize(pl_codes.astype(np.int64) * stride + fet_codes)
+    names = [f'{pl_uniques[pair // stride]}_{fet_uniques[pair % stride]}' for pair in pairs]
+    # Different pairs can render to the same name ('A_B' + 'C' and 'A' + 'B_C'), so factorize the names
+    name_codes, group_names = pd.factorize(np.array(names, dtype=object))
+    return pd.Categorical.from_codes(name_codes[pair_codes] if len(pair_codes) else pair_codes, categories=group_names)
 
-# Suppress warnings
-warnings.filterwarnings('ignore')
+def to_categoricals(df, columns=None):
+    """Convert the given object columns to categoricals in place."""
+    for col in columns or CATEGORICAL_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype('category')
+    return df
 
-def run_anomaly_detection():
+def from_categoricals(df):
+    """Return a copy of a report frame with categorical columns turned back into plain values."""
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    return df
+
+def detect_group_outliers(values, group_codes, detector=None, if_min_group_size=None, models=None, workers=None):
+    """Detect numeric outliers per group with the configured detector.
+
+    Returns {anomaly reason: row mask}. With a robust detector and a positive
+    `if_min_group_size`, groups of at least that size are scored by Isolation Forest.
+    If `models` is a dict, the compact models of the Isolation Forest groups are added to it.
+    `workers` is the Isolation Forest process count (default IF_WORKERS).
+    """
+    detector = detector or OUTLIER_DETECTOR
+    if_min_group_size = ISOLATION_FOREST_MIN_GROUP_SIZE if if_min_group_size is None else if_min_group_size
+    if detector not in OUTLIER_DETECTORS:
+        raise ValueError(f"Unknown outlier detector '{detector}', expected one of {list(OUTLIER_DETECTORS)}")
+    values = np.asarray(values, dtype=float)
+    group_codes = np.asarray(group_codes)
+    if detector == 'isolation_forest' or if_min_group_size <= 0:
+        detect, reason = OUTLIER_DETECTORS[detector]
+        if detector == 'isolation_forest':
+            return {reason: detect(values, group_codes, workers=workers, models=models)}
+        return {reason: detect(values, group_codes)}
+
+    group_sizes = np.bincount(group_codes)[group_codes] if len(group_codes) else np.zeros(0, dtype=int)
+    large_groups = group_sizes >= if_min_group_size
+    results = {}
+    for name, rows in ((detector, ~large_groups), ('isolation_forest', large_groups)):
+        detect, reason = OUTLIER_DETECTORS[name]
+        mask = np.zeros(len(values), dtype=bool)
+        if rows.any():
+            if name == 'isolation_forest':
+                mask[rows] = detect(values[rows], group_codes[rows], workers=workers, models=models)
+            else:
+                mask[rows] = detect(values[rows], group_codes[rows])
+        results[reason] = mask
+    return results
+
+# --- Value classification ---
+# Values containing one of these substrings count as numeric-like ranges or lists
+# ('1|2', '3/4', '5 to 6', ...) for the PL majority rule and are allowed by the format rule.
+ALLOWED_VALUE_PATTERN = re.compile(r'\||/|to|!| ')
+
+def classify_values(values):
+    """Classify a VALUE column for both pipelines, evaluating each distinct value once.
+
+    Returns a frame aligned with `values` holding VALUE_NUMERIC, is_numeric,
+    is_numeric_majority (numeric or allowed range/list text) and NON_NUMERIC_ANOMALY
+    (neither parseable by float() nor containing allowed characters).
+    """
+    value_numeric = pd.to_numeric(values, errors='coerce')
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+    allowed = pd.Series(uniques.astype(str), dtype=object).str.contains(ALLOWED_VALUE_PATTERN).to_numpy(dtype=bool)
+    majority = allowed.copy()
+    anomaly = ~allowed
+
+    kinds = np.array([
+        'str' if isinstance(value, str) else 'number' if isinstance(value, (int, float, np.number)) else 'other'
+        for value in uniques
+    ], dtype=object)
+    # Text: parsed like pd.to_numeric for the majority rule and like float() for the format rule
+    text = kinds == 'str'
+    majority[text] |= pd.to_numeric(pd.Series(uniques[text], dtype=object), errors='coerce').notna().to_numpy()
+    for position in np.flatnonzero(text & ~allowed):
+        try:
+            float(uniques[position])
+            anomaly[position] = False
+        except ValueError:
+            pass
+    # Numbers (never missing here, factorize drops NaN) are numeric and float()-able
+    number = kinds == 'number'
+    majority[number] = True
+    anomaly[number] = False
+    # Anything else (dates, times, ...) is rare enough to check one by one
+    for position in np.flatnonzero(kinds == 'other'):
+        value = uniques[position]
+        majority[position] = allowed[position] or pd.notna(pd.to_numeric(value, errors='coerce'))
+        if not allowed[position]:
+            try:
+                float(value)
+                anomaly[position] = False
+            except (TypeError, ValueError):
+                pass
+
+    # Missing values take code -1, i.e. the trailing entry: not numeric, and an anomaly
+    majority = np.append(majority, False)[codes]
+    anomaly = np.append(anomaly, True)[codes]
+    return pd.DataFrame({
+        'VALUE_NUMERIC': value_numeric,
+        'is_numeric': value_numeric.notna(),
+        'is_numeric_majority': majority,
+        'NON_NUMERIC_ANOMALY': anomaly,
+    }, index=values.index)
+
+# --- Pipeline profiling ---
+# Pipelines mark their stages with `profile_stage(...)`. When a PipelineProfile is passed as
+# `profile=` to a @profiled pipeline, each stage records wall time, rows in/out and the peak
+# resident memory of the server process while it ran (worker processes are not included).
+# Stages with the same name, e.g. one per streaming partition, are summed.
+_ACTIVE_PROFILE = contextvars.ContextVar('pipeline_profile', default=None)
+
+def _current_rss_bytes():
+    """Resident memory of this process, or None where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class _PeakRssSampler:
+    """Sample the resident memory in a background thread and keep the maximum."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = _current_rss_bytes()
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.done.wait(self.interval):
+            rss = _current_rss_bytes()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self):
+        if self.peak is not None:
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        rss = _current_rss_bytes()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+class PipelineProfile:
+    """Per-stage timings of one pipeline run, written as JSON (and a profiler dump if enabled)."""
+
+    def __init__(self, pipeline, profiler=None):
+        self.pipeline = pipeline
+        self.profiler_name = PIPELINE_PROFILER if profiler is None else profiler
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.total_seconds = 0.0
+        self.stages = OrderedDict()
+        self.profiler = None
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Time a stage; the caller may set `rows_out` on the yielded record."""
+        record = {'rows_in': rows_in, 'rows_out': None}
+        # Registered on entry so that stages are listed in start order, outer before nested
+        totals = self.stages.setdefault(name, {'stage': name, 'calls': 0, 'seconds': 0.0, 'rows_in': None, 'rows_out': None, 'peak_rss_mb': None})
+        start = time.perf_counter()
+        with _PeakRssSampler() as sampler:
+            try:
+                yield record
+            finally:
+                seconds = time.perf_counter() - start
+        totals['calls'] += 1
+        totals['seconds'] = round(totals['seconds'] + seconds, 4)
+        for key in ('rows_in', 'rows_out'):
+            if record[key] is not None:
+                totals[key] = (totals[key] or 0) + int(record[key])
+        if sampler.peak is not None:
+            totals['peak_rss_mb'] = max(totals['peak_rss_mb'] or 0, round(sampler.peak / 1024 ** 2, 1))
+
+    @contextmanager
+    def run(self):
+        """Activate this profile (and the optional profiler) for the pipeline call."""
+        token = _ACTIVE_PROFILE.set(self)
+        if self.profiler_name == 'cprofile':
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif self.profiler_name == 'pyinstrument':
+            from pyinstrument import Profiler
+            self.profiler = Profiler()
+            self.profiler.start()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total_seconds = round(self.total_seconds + time.perf_counter() - start, 4)
+            if self.profiler_name == 'cprofile':
+                self.profiler.disable()
+            elif self.profiler_name == 'pyinstrument':
+                self.profiler.stop()
+            _ACTIVE_PROFILE.reset(token)
+
+    def to_dict(self):
+        return {
+            'pipeline': self.pipeline,
+            'started': self.started,
+            'total_seconds': self.total_seconds,
+            'stages': list(self.stages.values()),
+        }
+
+    def write(self, base_path):
+        """Write `<base_path>.profile.json` and the profiler dump, if any. Returns the written paths."""
+        os.makedirs(os.path.dirname(os.path.abspath(base_path)), exist_ok=True)
+        paths = [f'{base_path}.profile.json']
+        with open(paths[0], 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        if self.profiler_name == 'cprofile' and self.profiler is not None:
+            paths.append(f'{base_path}.prof')
+            self.profiler.dump_stats(paths[-1])
+        elif self.profiler_name == 'pyinstrument' and self.profiler is not None:
+            paths.append(f'{base_path}.profile.html')
+            with open(paths[-1], 'w', encoding='utf-8') as f:
+                f.write(self.profiler.output_html())
+        return paths
+
+def profile_stage(name, rows_in=None):
+    """Context manager timing a stage of the active profile; a no-op without one."""
+    profile = _ACTIVE_PROFILE.get()
+    if profile is None:
+        return nullcontext({'rows_in': rows_in, 'rows_out': None})
+    return profile.stage(name, rows_in=rows_in)
+
+def profiled(pipeline):
+    """Let a pipeline function accept `profile=PipelineProfile(...)` to record its stages."""
+    @functools.wraps(pipeline)
+    def wrapper(*args, profile=None, **kwargs):
+        if profile is None:
+            return pipeline(*args, **kwargs)
+        with profile.run():
+            return pipeline(*args, **kwargs)
+    return wrapper
+
+# --- Progress reporting ---
+# Pipelines report progress through a reporter with Streamlit's success/info/warning/error
+# methods: the `st` module itself inside the app, or LogReporter when running headless.
+logger = logging.getLogger('anomaly_qa')
+
+class LogReporter:
+    """Reporter that sends pipeline messages to the `anomaly_qa` logger."""
+
+    def __init__(self, log=None):
+        self.log = log or logger
+
+    def success(self, message):
+        self.log.info(message)
+
+    def info(self, message):
+        self.log.info(message)
+
+    def warning(self, message):
+        self.log.warning(message)
+
+    def error(self, message):
+        self.log.error(message)
+
+def streamlit_is_running():
+    """Return True when the script runs inside a Streamlit server."""
+    try:
+        from streamlit import runtime
+        return runtime.exists()
+    except ImportError:
+        return False
+
+def get_reporter(reporter=None):
+    """Return `reporter`, or the default for the current mode (Streamlit or logging)."""
+    if reporter is not None:
+        return reporter
+    return st if streamlit_is_running() else LogReporter()
+
+@profiled
+def run_anomaly_detection(incremental=False, reporter=None, db_path=None):
     """Run the entire anomaly detection process"""
-    
+    reporter = get_reporter(reporter)
+
     # Load data using environment variables
-    file_path = os.path.join(DATA_DIR, DB_FILENAME)
+    file_path = db_path or os.path.join(DATA_DIR, DB_FILENAME)
     approved_file_path = os.path.join(DATA_DIR, APPROVED_FILENAME)
 
+    # Reuse the result of an earlier scan of the same DB, approved list and settings
     try:
-        data = pd.read_excel(file_path)
-        st.success(f"✅ Data loaded successfully! Found {len(data)} records.")
+        with profile_stage('Load approved anomalies') as stage:
+            approved_keys = get_approved_keys(approved_file_path)
+            stage['rows_out'] = len(approved_keys)
+        with profile_stage('Result cache lookup'):
+            cache_key = scan_cache_key(file_path, approved_keys)
+            cached = get_result_cache().get(cache_key)
+            # Full scans also save the per-GROUP models for upload validation when it uses them
+            model_set_id = group_model_set_id(file_path) if VALIDATION_SCORER == 'isolation_forest' and not incremental else None
     except Exception as e:
-        st.error(f"❌ Error loading data: {str(e)}")
+        reporter.error(f"❌ Error loading data: {str(e)}")
         return None
+    group_models = {} if model_set_id is not None else None
+    if cached is not None and (model_set_id is None or open_group_model_set(model_set_id) is not None):
+        reporter.success(f"⚡ Loaded cached results of an identical earlier scan: {len(cached)} anomalies.")
+        return cached
 
-    # Exclude approved anomalies
-    approved_df = load_approved_anomalies(approved_file_path)
-    if not approved_df.empty:
-        data = data.merge(approved_df, on=['PL_NAME', 'FET_NAME', 'VALUE'], how='left', indicator=True)
-        data = data[data['_merge'] == 'left_only'].drop(columns=['_merge'])
+    # Databases too large for the memory budget are processed chunk by chunk
+    try:
+        streaming = not incremental and use_streaming(file_path)
+    except Exception as e:
+        reporter.error(f"❌ Error loading data: {str(e)}")
+        return None
+    if streaming:
+        reporter.info(f"🌊 Database exceeds the {MEMORY_BUDGET_MB} MB memory budget; running in streaming mode.")
+        try:
+            with profile_stage('Streaming detection') as stage:
+                anomalies, cleaned_rows = detect_anomalies_streaming(file_path, approved_keys, group_models=group_models)
+                stage['rows_out'] = len(anomalies)
+        except Exception as e:
+            reporter.error(f"❌ Error loading data: {str(e)}")
+            return None
+        reporter.info(f"📊 After cleaning: {cleaned_rows} records remaining")
+        reporter.success(f"🎯 Anomaly detection completed! Found {len(anomalies)} anomalies.")
+        _store_group_models(model_set_id, group_models, reporter)
+        with profile_stage('Result cache store'):
+            get_result_cache().put(cache_key, anomalies)
+        return anomalies
 
-    # Clean and preprocess data
-    data_cleaned = data.dropna().copy()
-    st.info(f"📊 After cleaning: {len(data_cleaned)} records remaining")
-    
-    pl_name_col = 'PL_NAME'
-    fet_name_col = 'FET_NAME'
-    VALUE_ID_col = 'VALUE_ID'
-    value_col = 'VALUE'
-    unit_col = 'UNIT'
+    if use_duckdb():
+        # Loading, excluding approved anomalies and cleaning happen in one DuckDB query
+        try:
+            with profile_stage('Load, exclude and clean (DuckDB)') as stage:
+                data_cleaned, total_rows = query_clean_db(file_path, load_approved_anomalies(approved_file_path))
+                stage['rows_in'], stage['rows_out'] = total_rows, len(data_cleaned)
+            reporter.success(f"✅ Data loaded successfully! Found {total_rows} records.")
+        except Exception as e:
+            reporter.error(f"❌ Error loading data: {str(e)}")
+            return None
+    else:
+        try:
+            with profile_stage('Load DB') as stage:
+                data = load_parametric_db(file_path, columns=DB_COLUMNS)
+                stage['rows_out'] = len(data)
+            reporter.success(f"✅ Data loaded successfully! Found {len(data)} records.")
+        except Exception as e:
+            reporter.error(f"❌ Error loading data: {str(e)}")
+            return None
 
-    # Convert VALUE to numeric and flag non-numeric values for Isolation Forest only
-    data_cleaned['VALUE_NUMERIC'] = pd.to_numeric(data_cleaned[value_col], errors='coerce')
-    data_cleaned['is_numeric'] = data_cleaned['VALUE_NUMERIC'].notna()
+        # Exclude approved anomalies
+        with profile_stage('Exclude approved anomalies', rows_in=len(data)) as stage:
+            data = exclude_approved_anomalies(data, approved_keys)
+            stage['rows_out'] = len(data)
+
+        # Clean and preprocess data
+        with profile_stage('Clean', rows_in=len(data)) as stage:
+            data_cleaned = data.dropna().copy()
+            stage['rows_out'] = len(data_cleaned)
+    reporter.info(f"📊 After cleaning: {len(data_cleaned)} records remaining")
+
+    if incremental:
+        with profile_stage('Incremental detection', rows_in=len(data_cleaned)) as stage:
+            anomalies, rescanned = detect_anomalies_incremental(data_cleaned)
+            stage['rows_out'] = len(anomalies)
+        reporter.info(f"♻️ Incremental scan: re-ran {rescanned} of {data_cleaned['PL_NAME'].nunique()} PL_NAMEs with changed groups")
+    elif use_partitioned():
+        anomalies = detect_anomalies_partitioned(data_cleaned, group_models=group_models)
+    else:
+        anomalies = detect_anomalies(data_cleaned, group_models=group_models)
 
-    # Define custom logic for |, /, or 'to' in the majority/minority calculation
-    def custom_majority_check(value):
-        if pd.notna(value) and any(sub in str(value) for sub in ['|', '/', 'to', '!', ' '] ):
-            return True  # Treat as numeric for majority/minority calculation
-        return pd.notna(pd.to_numeric(value, errors='coerce'))
+    reporter.success(f"🎯 Anomaly detection completed! Found {len(anomalies)} anomalies.")
+    _store_group_models(model_set_id, group_models, reporter)
+    with profile_stage('Result cache store'):
+        get_result_cache().put(cache_key, anomalies)
 
-    data_cleaned['is_numeric_majority'] = data_cleaned[value_col].apply(custom_majority_check)
+    return anomalies
+
+def _store_group_models(model_set_id, group_models, reporter):
+    """Save the models a full scan collected; a failure only costs upload validation its models."""
+    if model_set_id is None:
+        return
+    try:
+        with profile_stage('Save group models', rows_in=len(group_models)):
+            save_group_models(model_set_id, group_models)
+        reporter.info(f"🌲 Saved Isolation Forest models of {len(group_models)} groups for upload validation.")
+    except Exception as e:
+        reporter.warning(f"⚠️ Could not save the group models: {str(e)}")
+
+def exclude_approved_anomalies(data, approved_keys):
+    """Drop rows whose (PL_NAME, FET_NAME, VALUE) is in the approved anomalies, keeping the index."""
+    if len(approved_keys) == 0:
+        return data
+    keys = approved_key_hashes(data)
+    positions = np.minimum(np.searchsorted(approved_keys, keys), len(approved_keys) - 1)
+    return data[approved_keys[positions] != keys]
+
+def compute_row_checks(data_cleaned):
+    """Add the row-local helper columns and checks (numeric conversion, GROUP, unit and value format) in place."""
+    value_col = 'VALUE'
+
+    # Classify VALUE once: numeric conversion for the outlier detector, numeric-like values for
+    # the PL majority rule and values without allowed characters for the format rule
+    with profile_stage('Classify values', rows_in=len(data_cleaned)):
+        classified = classify_values(data_cleaned[value_col])
+        for col in ['VALUE_NUMERIC', 'is_numeric', 'is_numeric_majority']:
+            data_cleaned[col] = classified[col]
 
     # Combine PL_NAME and FET_NAME to create a unique group identifier
-    data_cleaned['GROUP'] = data_cleaned[pl_name_col].astype(str) + '_' + data_cleaned[fet_name_col].astype(str)
-
-    # Define valid units for different types of measurements
-    valid_units = {
-        'Current': ['A'],
-        'Voltage': ['V'],
-        'Weight': ['g','lb', 'oz'],
-        'Frequency': ['Hz'],
-        'Resistance': ['Ohm'],
-        'Power': ['W','dB','VA','HP'],
-        'Capacitance': ['F'],
-        'Impedance': ['Ohm'],
-        'Gain': ['dB'],
-        'Thermal': ['c', 'k', '°'] ,
-        'Temperature': ['c', 'k', '°'] ,
-        'Tolerance': ['%','ppm','ppb'] ,
-        'Ratio': ['%'] ,
-        'Efficiency': ['%'] ,
-        'Aging': ['Year','ppm'] ,
-        'Noise': ['db','ppm'] ,
-        'Stability': ['ppm'] ,
-        'Sensitivity': ['db'] ,
-        'Gain Bandwidth': ['Hz'] ,
-        'Breaking Capacity': ['A'] ,
-        'Gain Attenuation': ['dB'] ,
-        'Loss': ['dB'],
-        'Mean Spherical Candle Power': ['MSCP'],
-        'Minimum Isolation Voltage' : ['db'] , 
-          'Current': ['A'], 'Voltage': ['V'], 'Weight': ['g','lb', 'oz'], 'Frequency': ['Hz'],
-        'Resistance': ['Ohm'], 'Power': ['W','dB','VA','HP'], 'Capacitance': ['F'], 'Impedance': ['Ohm'],
-        'Gain': ['dB'], 'Thermal': ['c', 'k', '°'], 'Temperature': ['c', 'k', '°'],
-        'Tolerance': ['%','ppm','ppb'], 'Ratio': ['%'], 'Efficiency': ['%'], 'Aging': ['Year','ppm'],
-        'Noise': ['db','ppm'], 'Stability': ['ppm'], 'Sensitivity': ['db'], 'Gain Bandwidth': ['Hz'],
-        'Breaking Capacity': ['A'], 'Gain Attenuation': ['dB'], 'Loss': ['dB'], 'Mean Spherical Candle Power': ['MSCP'],
-        'Minimum Isolation Voltage' : ['db'] ,
-        'time' : ['s','min','h','ns','d','month','year',''],
-        'color': [''],
-        'depth': ['m','cm','mm','in','ft','mile'],
-        'height' : ['m','cm','mm','in','ft','mile'],
-        'length' : ['m','cm','mm','in','ft','mile'],
-        'size' : ['m','cm','mm','in','gallon','AWG','b','B','bit','byte','oz','word','pixel','cc','ounce'],
-        'Rate' : [    'bps', 'sps', 'N/mm', 'Hz', 'V/us', 'SCFM|GPH', 'r/min', 'bE', 'lbs/in', 'N.mm/deg', 'WPS', 'L/min', 'Bd', 'fps', 'Gbps', 'lb/in', 'L/sec', 'm³/h', 'gpm', 'slm', 'slpm', 
-        'sccm', 'g', 'SPS', 'm/s', 'ft/min', 'scfh', 'Grms', 'ft²/min', 
-        'Gs', 's', '', 'Tps', 'baud', 'CFM', 'rpm'] ,
-        'Material': ['','  '],
-        'Diameter' : ['m','cm','mm','in','ft','mile'],
-        'speed' : ['m/s','km/h','mph','hz','kph','rpm','pbs','rps','cm/s','ft/s','G','Sec','bps'],
-        'width' : ['m','cm','mm','in','ft','mile','°','pbs','hz'],
-        'dimension' : ['m'],
-        'thickness' : ['m','in'],
-        'mounting' : ['m','in',''],
-        'Coefficient' : ['%'],
-        'noise': ['dB','db','ppm','%'],
-        'gender': [''],
-        'Supported Device' :['','  '],
-        'area' : ['m2','cm2','mm2','inch2','ft2','acre'],
-        'volume' : ['m3','cm3','mm3','inch3','ft3','liter'],
-        'pressure' : ['Pa','kPa','MPa','bar','psi'],
-        'energy' : ['J','kJ','cal','Wh','kWh'],
-        'power' : ['W','kW','MW'],
-        'torque' : ['Nm','lb-ft','kg-m'],
-        'force' : ['N','kN','lb','kg'],
-        'acceleration' : ['m/s2','g'],
-        'density' : ['kg/m3','g/cm3','lb/in3'] ,
-        'type': ['','°','bit',' '],
-        'Bandwidth' : ['Hz','bps'],
-        'number' : ['','Turns','key','byte','b',' ']
-    }
+    with profile_stage('Build groups', rows_in=len(data_cleaned)):
+        to_categoricals(data_cleaned)
+        data_cleaned['GROUP'] = build_group_column(data_cleaned['PL_NAME'], data_cleaned['FET_NAME'])
 
-    # Updated function to validate units based on FET_NAME with partial match support
-    def is_valid_unit(unit, fet_name):
-        if pd.isna(unit):  # Handle missing units
-            return False
-        unit_parts = str(unit).lower().split('|')  # Split compound units
-        unit_valid = False
-        for part in unit_parts:
-            part = part.strip()  # Clean whitespace
-            for key, units in valid_units.items():
-                if key.lower() in str(fet_name).lower():  # Match FET_NAME to valid unit types
-                    if any(valid_unit.lower() in part for valid_unit in units):
-                        unit_valid = True
-                        break  # Stop checking once a match is found
-        return unit_valid
-
-    # Initialize anomaly detection columns
-    data_cleaned['ANOMALY'] = False
-    data_cleaned['ANOMALY_REASON'] = ''
+    # Detect invalid units
+    with profile_stage('Unit validation', rows_in=len(data_cleaned)) as stage:
+        data_cleaned['INVALID_UNIT'] = find_invalid_units(data_cleaned, 'UNIT', 'FET_NAME', get_unit_rules())
+        stage['rows_out'] = int(data_cleaned['INVALID_UNIT'].sum())
+
+    # Detect non-numeric values without allowed characters
+    data_cleaned['NON_NUMERIC_ANOMALY'] = classified['NON_NUMERIC_ANOMALY']
+    return data_cleaned
+
+def detect_anomalies(data_cleaned, group_models=None, if_workers=None):
+    """Apply all detection rules to a cleaned DB frame and return the anomaly report rows.
+
+    Every rule only looks at rows sharing a PL_NAME, so the frame may hold any subset
+    of complete PL_NAMEs. Helper columns are added to `data_cleaned` in place.
+    If `group_models` is a dict, the compact Isolation Forest model of every fitted
+    GROUP is added to it under the GROUP name. `if_workers` overrides IF_WORKERS.
+    """
+    pl_name_col = 'PL_NAME'
+
+    # Row-local checks may already have been computed chunk by chunk (streaming mode)
+    if 'INVALID_UNIT' not in data_cleaned.columns:
+        compute_row_checks(data_cleaned)
+
+    # Initialize anomaly detection flags
+    data_cleaned['ANOMALY_FLAGS'] = np.zeros(len(data_cleaned), dtype=np.uint16)
 
     # Detect invalid units
-    invalid_unit_mask = ~data_cleaned.apply(lambda row: is_valid_unit(row[unit_col], row[fet_name_col]), axis=1)
-    data_cleaned.loc[invalid_unit_mask, 'ANOMALY'] = True
-    data_cleaned.loc[invalid_unit_mask, 'ANOMALY_REASON'] += 'Invalid unit for measurement; '
-
-    # Apply Isolation Forest for numeric anomalies
-    def apply_isolation_forest(group):
-        numeric_rows = group[group['is_numeric']].copy()
-        numeric_rows = numeric_rows.dropna(subset=['VALUE_NUMERIC'])  # Drop NaNs before applying Isolation Forest
-        if len(numeric_rows) > 1:
-            features = numeric_rows[['VALUE_NUMERIC']].astype(float)
-            iso_forest = IsolationForest(contamination=0.0001, random_state=42)
-            iso_forest.fit(features)
-            predictions = iso_forest.predict(features)
-            anomaly_mask = predictions == -1
-            group.loc[numeric_rows.index[anomaly_mask], 'ANOMALY'] = True
-            group.loc[numeric_rows.index[anomaly_mask], 'ANOMALY_REASON'] += 'Isolation Forest anomaly detected; '
-        return group
-
-    data_cleaned = data_cleaned.groupby('GROUP', group_keys=False).apply(apply_isolation_forest)
-
-    # Detect PL group anomalies based on majority type
-    def detect_pl_group_anomaly(df):
-        pl_group = df.groupby(pl_name_col)
-        majority_types = pl_group['is_numeric_majority'].agg(['sum', 'count'])
-        majority_types['non_numeric'] = majority_types['count'] - majority_types['sum']
-        majority_types['PL_MAJORITY_TYPE'] = majority_types.apply(
-            lambda row: 'numeric' if row['sum'] > row['non_numeric'] else 'non_numeric', axis=1
-        )
-        df = df.merge(
-            majority_types['PL_MAJORITY_TYPE'],
-            left_on=pl_name_col,
-            right_index=True,
-            how='left'
+    data_cleaned['ANOMALY_FLAGS'] = add_reason_flag(data_cleaned['ANOMALY_FLAGS'], data_cleaned['INVALID_UNIT'], 'Invalid unit for measurement')
+
+    # Detect numeric outliers per GROUP with the configured detector
+    numeric_rows = data_cleaned['is_numeric'].to_numpy()
+    group_codes, group_names = pd.factorize(data_cleaned['GROUP'])
+    models = {} if group_models is not None else None
+    with profile_stage('Outlier detection', rows_in=int(numeric_rows.sum())) as stage:
+        outliers = detect_group_outliers(data_cleaned['VALUE_NUMERIC'].to_numpy()[numeric_rows], group_codes[numeric_rows],
+                                         models=models, workers=if_workers)
+        for reason, mask in outliers.items():
+            outlier_mask = np.zeros(len(data_cleaned), dtype=bool)
+            outlier_mask[numeric_rows] = mask
+            data_cleaned['ANOMALY_FLAGS'] = add_reason_flag(data_cleaned['ANOMALY_FLAGS'], outlier_mask, reason)
+        stage['rows_out'] = int(sum(mask.sum() for mask in outliers.values()))
+    if models:
+        group_models.update((str(group_names[code]), model) for code, model in models.items())
+
+    # Detect PL group anomalies based on majority type (numeric only with a strict majority)
+    with profile_stage('Majority and format rules', rows_in=len(data_cleaned)):
+        pl_codes = pd.factorize(data_cleaned[pl_name_col])[0]
+        is_numeric_majority = data_cleaned['is_numeric_majority'].to_numpy(dtype=bool)
+        numeric_count = np.bincount(pl_codes, weights=is_numeric_majority)
+        pl_numeric_majority = (numeric_count > np.bincount(pl_codes) - numeric_count)[pl_codes]
+        flags = data_cleaned['ANOMALY_FLAGS'].to_numpy()
+        flags = add_reason_flag(flags, pl_numeric_majority & ~is_numeric_majority, 'PL majority is numeric but value is non-numeric')
+        flags = add_reason_flag(flags, ~pl_numeric_majority & is_numeric_majority, 'PL majority is non-numeric but value is numeric')
+
+        # Detect non-numeric anomalies
+        flags = add_reason_flag(flags, data_cleaned['NON_NUMERIC_ANOMALY'], 'Non-numeric value without allowed characters')
+        data_cleaned['ANOMALY_FLAGS'] = flags
+        data_cleaned['ANOMALY'] = flags != 0
+
+    # Average and median VALUE per GROUP in one aggregation, kept only for groups with an outlier
+    # detector hit (only rows whose sole reason is the outlier detector count, as with the former
+    # reason text match)
+    with profile_stage('Group aggregation', rows_in=len(data_cleaned)):
+        group_stats = pd.DataFrame({
+            'value': data_cleaned['VALUE_NUMERIC'].to_numpy(dtype=float),
+            'outlier_hit': np.isin(flags, OUTLIER_FLAGS),
+        }).groupby(group_codes).agg(Average=('value', 'mean'), Median=('value', 'median'), outlier_hit=('outlier_hit', 'any'))
+        group_stats.loc[~group_stats['outlier_hit'], ['Average', 'Median']] = np.nan
+        data_cleaned['Average'] = group_stats['Average'].to_numpy()[group_codes]
+        data_cleaned['Median'] = group_stats['Median'].to_numpy()[group_codes]
+
+        # Controlled Anomaly: the value lies within +/- 50 of its GROUP average (False without an average)
+        difference = data_cleaned['Average'] - data_cleaned['VALUE_NUMERIC']
+        data_cleaned['Controlled_Anomaly'] = (difference >= -50) & (difference <= 50)
+
+    # Filter out anomalies that are within the controlled range (if Controlled_Anomaly is True)
+    with profile_stage('Build report', rows_in=len(data_cleaned)) as stage:
+        anomalies = data_cleaned[(data_cleaned['ANOMALY']) & (~data_cleaned['Controlled_Anomaly'])]
+
+        # Render the reason text for the reported rows only
+        anomalies = anomalies.assign(ANOMALY_REASON=render_anomaly_reasons(anomalies['ANOMALY_FLAGS'], 'No anomaly'))
+        stage['rows_out'] = len(anomalies)
+    return from_categoricals(anomalies[REPORT_COLUMNS])
+
+# --- Streaming detection ---
+# Rough in-memory size of the pipeline's working set relative to the raw rows it processes
+_PIPELINE_MEMORY_FACTOR = 8
+
+def _estimated_pipeline_bytes_per_row(parquet_file):
+    """Estimate the pipeline's memory per DB row from the cache's uncompressed size."""
+    metadata = parquet_file.metadata
+    if metadata.num_rows == 0:
+        return 1
+    raw_bytes = sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+    return max(1, raw_bytes // metadata.num_rows) * _PIPELINE_MEMORY_FACTOR
+
+def use_streaming(file_path):
+    """Decide whether the DB should be processed in streaming mode (see STREAMING_MODE)."""
+    if STREAMING_MODE in ('on', 'off'):
+        return STREAMING_MODE == 'on'
+    import pyarrow.parquet as pq
+    ensure_db_cache(file_path)
+    parquet_file = pq.ParquetFile(_db_cache_paths(file_path)[0])
+    estimated = parquet_file.metadata.num_rows * _estimated_pipeline_bytes_per_row(parquet_file)
+    return estimated > MEMORY_BUDGET_MB * 1024 * 1024
+
+def detect_anomalies_streaming(file_path, approved_keys, memory_budget_mb=None, group_models=None):
+    """Run the detection pipeline with memory bounded by a budget instead of by the DB size.
+
+    The DB cache is read in chunks; row-local checks run per chunk and the rows are
+    spilled to disk partitioned by a hash of PL_NAME. Each partition holds complete
+    PL_NAMEs, so the group-level rules then run on one partition at a time.
+    Returns the anomaly report and the number of rows after cleaning.
+    """
+    import pyarrow.parquet as pq
+    ensure_db_cache(file_path)
+    parquet_file = pq.ParquetFile(_db_cache_paths(file_path)[0], memory_map=True)
+    budget = (memory_budget_mb or MEMORY_BUDGET_MB) * 1024 * 1024
+    row_bytes = _estimated_pipeline_bytes_per_row(parquet_file)
+    chunk_rows = max(1000, budget // row_bytes)
+    partitions = max(1, math.ceil(parquet_file.metadata.num_rows * row_bytes / budget))
+    schema_names = parquet_file.schema_arrow.names
+    columns = [c for c in DB_COLUMNS if c in schema_names]
+    columns += [c + _KIND_SUFFIX for c in columns if c + _KIND_SUFFIX in schema_names]
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    spill_dir = tempfile.mkdtemp(prefix='spill-', dir=CACHE_DIR)
+    try:
+        offset, cleaned_rows = 0, 0
+        for chunk_id, batch in enumerate(parquet_file.iter_batches(batch_size=chunk_rows, columns=columns)):
+            chunk = _decode_mixed_columns(batch.to_pandas())
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            chunk = exclude_approved_anomalies(chunk, approved_keys).dropna().copy()
+            cleaned_rows += len(chunk)
+            compute_row_checks(chunk)
+            partition_ids = pd.util.hash_array(chunk['PL_NAME'].astype(str).to_numpy(dtype=object)) % partitions
+            for partition_id, part in chunk.groupby(partition_ids):
+                part_path = os.path.join(spill_dir, f'part-{partition_id:05d}-{chunk_id:06d}.parquet')
+                _encode_mixed_columns(part).to_parquet(part_path, index=True)
+            del chunk
+
+        results = []
+        for partition_id in range(partitions):
+            files = sorted(f for f in os.listdir(spill_dir) if f.startswith(f'part-{partition_id:05d}-'))
+            if not files:
+                continue
+            part = pd.concat([_decode_mixed_columns(pd.read_parquet(os.path.join(spill_dir, f))) for f in files])
+            results.append(detect_anomalies(part, group_models=group_models))
+            del part
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    anomalies = pd.concat(results).sort_index() if results else pd.DataFrame(columns=REPORT_COLUMNS)
+    return anomalies, cleaned_rows
+
+# --- Partitioned detection ---
+# Every detection rule only looks at rows sharing a PL_NAME, so the cleaned DB is split into
+# shards of complete PL_NAMEs by a hash of the name, and each shard runs the whole pipeline in
+# its own worker. The shard reports are concatenated back in DB row order, so the report is
+# the same as from a single `detect_anomalies` call.
+PARTITION_BACKENDS = ['processes', 'dask', 'ray']
+
+@functools.lru_cache(maxsize=None)
+def _import_partition_backend(backend):
+    """Return the dask or ray module, or None (logged once) when it is not installed."""
+    try:
+        return __import__(backend)
+    except ImportError:
+        logger.warning("PARTITION_MODE=%s but %s is not installed; using a local process pool.", backend, backend)
+        return None
+
+def use_partitioned():
+    """Return True when full scans run partitioned by PL_NAME (see PARTITION_MODE)."""
+    if PARTITION_MODE == 'off':
+        return False
+    if PARTITION_MODE not in PARTITION_BACKENDS:
+        raise ValueError(f"Unknown partition mode '{PARTITION_MODE}', expected 'off' or one of {PARTITION_BACKENDS}")
+    return True
+
+def partition_by_pl_name(data_cleaned, shards):
+    """Split a cleaned DB frame into up to `shards` frames of complete PL_NAMEs by a stable hash of the name."""
+    pl_codes, pl_names = pd.factorize(data_cleaned['PL_NAME'])
+    # Hash each distinct name once; the same PL_NAME always lands in the same shard
+    name_shards = pd.util.hash_array(np.asarray(pl_names.astype(str), dtype=object)) % np.uint64(shards)
+    shard_ids = name_shards.astype(np.int64)[pl_codes]
+    return [part for _, part in data_cleaned.groupby(shard_ids, sort=True)]
+
+def _detect_shard(shard, keep_models):
+    """Run the detection pipeline on one shard; Isolation Forest stays in the shard's process."""
+    group_models = {} if keep_models else None
+    return detect_anomalies(shard, group_models=group_models, if_workers=1), group_models
+
+def _run_shards(shards, keep_models, backend, workers):
+    """Run `_detect_shard` on every shard with the given backend and return the results in shard order."""
+    # Worker processes reach `_detect_shard` through anomaly_core, which imports this script as a
+    # regular module there; this script's own functions cannot be pickled under Streamlit
+    app_path = os.path.abspath(__file__)
+    if backend == 'dask' and _import_partition_backend('dask') is not None:
+        dask = _import_partition_backend('dask')
+        tasks = [dask.delayed(anomaly_core.detect_shard)(app_path, shard, keep_models) for shard in shards]
+        return list(dask.compute(*tasks, scheduler='processes', num_workers=workers))
+    if backend == 'ray' and _import_partition_backend('ray') is not None:
+        ray = _import_partition_backend('ray')
+        if not ray.is_initialized():
+            ray.init(num_cpus=workers, include_dashboard=False, ignore_reinit_error=True)
+        remote = ray.remote(anomaly_core.detect_shard)
+        return ray.get([remote.remote(app_path, shard, keep_models) for shard in shards])
+    if workers <= 1 or len(shards) <= 1:
+        return [_detect_shard(shard, keep_models) for shard in shards]
+    # Largest shards first, so a big shard is not left running alone at the end
+    order = sorted(range(len(shards)), key=lambda i: -len(shards[i]))
+    results = [None] * len(shards)
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+        futures = {executor.submit(anomaly_core.detect_shard, app_path, shards[i], keep_models): i for i in order}
+        for future, i in futures.items():
+            results[i] = future.result()
+    return results
+
+def detect_anomalies_partitioned(data_cleaned, group_models=None, backend=None, workers=None, shards=None):
+    """Run `detect_anomalies` separately on shards of PL_NAMEs in parallel and return the combined report.
+
+    `backend` is 'processes', 'dask' or 'ray' (default PARTITION_MODE); a missing dask or
+    ray falls back to the process pool. Isolation Forest runs inside each shard's worker.
+    """
+    backend = backend or (PARTITION_MODE if PARTITION_MODE in PARTITION_BACKENDS else 'processes')
+    workers = workers or PARTITION_WORKERS
+    shards = shards or PARTITION_SHARDS or 4 * workers
+    parts = partition_by_pl_name(data_cleaned, shards)
+    with profile_stage(f'Partitioned detection ({len(parts)} shards, {backend})', rows_in=len(data_cleaned)) as stage:
+        results = _run_shards(parts, group_models is not None, backend, workers)
+        reports = [report for report, _ in results]
+        anomalies = pd.concat(reports).sort_index() if reports else detect_anomalies(data_cleaned)
+        stage['rows_out'] = len(anomalies)
+    if group_models is not None:
+        for _, models in results:
+            group_models.update(models)
+    return anomalies
+
+# --- Incremental detection ---
+def _detection_config_fingerprint():
+    """Fingerprint of the settings, besides the data itself, that change the detection result."""
+    config = {
+        'version': 1,
+        'unit_rules': _file_fingerprint(UNIT_RULES_FILE, with_hash=True)['sha256'],
+        'detector': OUTLIER_DETECTOR,
+        'if_min_group_size': ISOLATION_FOREST_MIN_GROUP_SIZE,
+        'mad_threshold': MAD_THRESHOLD,
+        'iqr_multiplier': IQR_MULTIPLIER,
+    }
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _group_keys(data_cleaned):
+    """Return the PL_NAME key, GROUP and position-within-GROUP of every row."""
+    pl_keys = data_cleaned['PL_NAME'].astype(str)
+    groups = pd.Series(build_group_column(data_cleaned['PL_NAME'], data_cleaned['FET_NAME']), index=data_cleaned.index)
+    positions = groups.groupby(groups, sort=False, observed=True).cumcount()
+    return pl_keys, groups, positions
+
+def group_fingerprints(data_cleaned):
+    """Return the row count and an order-sensitive content hash of every (GROUP, PL_NAME)."""
+    pl_keys, groups, positions = _group_keys(data_cleaned)
+    row_hashes = pd.util.hash_pandas_object(data_cleaned[[c for c in DB_COLUMNS if c in data_cleaned.columns]], index=False)
+    # Mix each row's position into its hash so reordering rows inside a group is detected
+    mixed = pd.util.hash_array(row_hashes.to_numpy() ^ (positions.to_numpy().astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)))
+    frame = pd.DataFrame({'GROUP': groups.to_numpy(), 'PL_KEY': pl_keys.to_numpy(), 'HASH': mixed})
+    return frame.groupby(['GROUP', 'PL_KEY'], sort=False).agg(ROWS=('HASH', 'size'), HASH=('HASH', 'sum'))
+
+def _dirty_pl_keys(current, previous):
+    """Return the PL_NAMEs with added, removed or changed groups since the previous fingerprints."""
+    merged = current.join(previous, how='outer', rsuffix='_PREV')
+    changed = (merged['ROWS'] != merged['ROWS_PREV']) | (merged['HASH'] != merged['HASH_PREV'])
+    keys = merged.index.to_frame(index=False)
+    dirty = set(keys.loc[changed.to_numpy(), 'PL_KEY'])
+    # A GROUP name can be shared by two PL_NAMEs ('A_B' + 'C' and 'A' + 'B_C'), so spread through shared groups
+    while True:
+        dirty_groups = keys.loc[keys['PL_KEY'].isin(dirty), 'GROUP']
+        expanded = set(keys.loc[keys['GROUP'].isin(dirty_groups), 'PL_KEY'])
+        if expanded <= dirty:
+            return dirty
+        dirty |= expanded
+
+def _load_incremental_state(state_dir, config):
+    """Load the previous run's fingerprints and anomalies, or None if missing or made with another config."""
+    state_path = os.path.join(state_dir, 'state.json')
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('config') != config:
+        return None
+    fingerprints = pd.read_parquet(os.path.join(state_dir, state['fingerprints'])).set_index(['GROUP', 'PL_KEY'])
+    fingerprints['HASH'] = fingerprints['HASH'].astype(np.uint64)
+    anomalies = _decode_mixed_columns(pd.read_parquet(os.path.join(state_dir, state['anomalies'])))
+    return fingerprints, anomalies
+
+def _save_incremental_state(state_dir, config, fingerprints, anomalies):
+    """Persist this run's fingerprints and anomalies; state.json is swapped in last so readers never see a mix."""
+    os.makedirs(state_dir, exist_ok=True)
+    generation = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    files = {'fingerprints': f'fingerprints-{generation}.parquet', 'anomalies': f'anomalies-{generation}.parquet'}
+    fingerprints.reset_index().to_parquet(os.path.join(state_dir, files['fingerprints']), index=False)
+    _encode_mixed_columns(anomalies).to_parquet(os.path.join(state_dir, files['anomalies']), index=False)
+    tmp_path = os.path.join(state_dir, f'state.json.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'config': config, **files}, f)
+    os.replace(tmp_path, os.path.join(state_dir, 'state.json'))
+    for name in os.listdir(state_dir):
+        if name.endswith('.parquet') and name not in files.values():
+            os.remove(os.path.join(state_dir, name))
+
+def detect_anomalies_incremental(data_cleaned, state_dir=None):
+    """Detect anomalies, re-running the rules only for PL_NAMEs whose groups changed since the last run.
+
+    Results for untouched PL_NAMEs are taken from the previous run's report, so the
+    output matches `detect_anomalies` on the full frame. Returns the anomaly report
+    and the number of PL_NAMEs that were rescanned.
+    """
+    state_dir = state_dir or INCREMENTAL_DIR
+    config = _detection_config_fingerprint()
+    fingerprints = group_fingerprints(data_cleaned)
+    previous = _load_incremental_state(state_dir, config)
+    pl_keys, groups, positions = _group_keys(data_cleaned)
+
+    if previous is None:
+        dirty = set(pl_keys.unique())
+    else:
+        dirty = _dirty_pl_keys(fingerprints, previous[0])
+    dirty_rows = pl_keys.isin(dirty).to_numpy()
+
+    parts = []
+    if dirty_rows.any():
+        detect = detect_anomalies_partitioned if use_partitioned() else detect_anomalies
+        parts.append(detect(data_cleaned[dirty_rows].copy()))
+    if previous is not None:
+        reused = previous[1][~previous[1]['PL_KEY'].isin(dirty)]
+        # Untouched groups are row-for-row identical, so map (GROUP, position) to the current index
+        clean_index = pd.Series(
+            data_cleaned.index[~dirty_rows],
+            index=pd.MultiIndex.from_arrays([groups[~dirty_rows], positions[~dirty_rows]]),
         )
-        mask_numeric_majority = df['PL_MAJORITY_TYPE'] == 'numeric'
-        mask_non_numeric_majority = df['PL_MAJORITY_TYPE'] == 'non_numeric'
-        mask_anomaly_numeric = mask_numeric_majority & (~df['is_numeric_majority'])
-        mask_anomaly_non_numeric = mask_non_numeric_majority & (df['is_numeric_majority'])
-        df.loc[mask_anomaly_numeric, 'ANOMALY'] = True
-        df.loc[mask_anomaly_numeric, 'ANOMALY_REASON'] += 'PL majority is numeric but value is non-numeric; '
-        df.loc[mask_anomaly_non_numeric, 'ANOMALY'] = True
-        df.loc[mask_anomaly_non_numeric, 'ANOMALY_REASON'] += 'PL majority is non-numeric but value is numeric; '
-        return df
-
-    data_cleaned = detect_pl_group_anomaly(data_cleaned)
-
-    # Detect non-numeric anomalies
-    def detect_non_numeric_anomaly(df):
-        def is_non_numeric_anomaly(value):
-            if pd.notna(value):
-                if any(char in str(value) for char in ['|', '/', 'to', '!', ' ','!!'] ):
-                    return False
-                try:
-                    float(value)
-                    return False
-                except ValueError:
-                    return True
-            return True
-
-        anomaly_mask = df[value_col].apply(is_non_numeric_anomaly)
-        df.loc[anomaly_mask, 'ANOMALY'] = True
-        df.loc[anomaly_mask, 'ANOMALY_REASON'] += 'Non-numeric value without allowed characters; '
-        return df
-
-    data_cleaned = detect_non_numeric_anomaly(data_cleaned)
-
-    # Clean up anomaly reason column
-    data_cleaned['ANOMALY_REASON'] = data_cleaned['ANOMALY_REASON'].str.rstrip('; ').replace('', 'No anomaly')
-
-    # Calculate the average and median value per GROUP for anomalies detected by Isolation Forest
-    def calculate_average_and_median(group):
-        if 'Isolation Forest anomaly detected' in group['ANOMALY_REASON'].values:
-            group['Average'] = group['VALUE_NUMERIC'].mean()
-            group['Median'] = group['VALUE_NUMERIC'].median()  # Adding median calculation
+        reused.index = clean_index.reindex(pd.MultiIndex.from_arrays([reused['GROUP'], reused['GROUP_POS']])).to_numpy()
+        parts.append(reused.drop(columns=['PL_KEY', 'GROUP_POS']))
+    anomalies = pd.concat(parts).sort_index() if parts else detect_anomalies(data_cleaned)
+
+    state = anomalies.assign(PL_KEY=pl_keys.loc[anomalies.index], GROUP_POS=positions.loc[anomalies.index])
+    _save_incremental_state(state_dir, config, fingerprints, state)
+    return anomalies, len(dirty)
+
+# --- Group statistics index ---
+def build_group_stats_index(db_data):
+    """Compute mean, std and count of the numeric values of every GROUP in the DB."""
+    db_cleaned = db_data.dropna()
+    groups = db_cleaned['PL_NAME'].astype(str) + '_' + db_cleaned['FET_NAME'].astype(str)
+    values = pd.to_numeric(db_cleaned['VALUE'], errors='coerce')
+    stats = values.groupby(groups).agg(['mean', 'std', 'count'])
+    stats.columns = ['DB_MEAN', 'DB_STD', 'DB_COUNT']
+    stats.index.name = 'GROUP'
+    return stats
+
+def load_group_stats_index(db_file_path):
+    """Load the per-GROUP statistics index saved next to the DB cache, rebuilding it when the DB changed."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ensure_db_cache(db_file_path)
+    cache_path, meta_path = _db_cache_paths(db_file_path)
+    stats_path = cache_path[:-len('.parquet')] + '.group_stats.parquet'
+    with open(meta_path, encoding='utf-8') as f:
+        source_hash = json.load(f)['sha256']
+
+    def is_current():
+        if not os.path.exists(stats_path):
+            return False
+        return pq.read_schema(stats_path).metadata.get(b'source_sha256', b'').decode() == source_hash
+
+    if is_current():
+        return pd.read_parquet(stats_path)
+    # Rebuilt under the DB's lock, so concurrent callers compute the statistics only once
+    with _db_cache_lock(db_file_path):
+        if is_current():
+            return pd.read_parquet(stats_path)
+        if use_duckdb():
+            stats = query_group_stats(db_file_path)
         else:
-            group['Average'] = None
-            group['Median'] = None  # If no anomaly, set median to None
-        return group
+            stats = build_group_stats_index(load_parametric_db(db_file_path, columns=DB_COLUMNS))
+        table = pa.Table.from_pandas(stats)
+        table = table.replace_schema_metadata({**table.schema.metadata, b'source_sha256': source_hash.encode()})
+        tmp_path = f'{stats_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, stats_path)
+    return stats
 
-    # Apply the updated function to calculate both average and median
-    data_cleaned = data_cleaned.groupby('GROUP', group_keys=False).apply(calculate_average_and_median)
+# --- Upload ingestion ---
+# Uploads may be Excel (.xlsx/.xls), CSV or Parquet; the format is detected from the file's
+# first bytes, so it does not depend on the file name. The header is read and checked before
+# the rows are parsed, and only the columns the pipelines use are read. Excel is parsed with
+# calamine when python-calamine is installed. CSV cells are read as text without dtype
+# inference. Numeric-looking VALUE cells are then converted once per distinct text, so they
+# compare (e.g. with approved anomalies) like the same cells typed in Excel; names and units
+# stay text, so a PL_NAME such as '007' keeps matching the DB's groups.
+UPLOAD_FILE_TYPES = ['xlsx', 'xls', 'csv', 'parquet']
+UPLOAD_VALUE_COLUMNS = ['PL_NAME', 'FET_NAME', 'VALUE', 'UNIT']
+UPLOAD_OPTIONAL_COLUMNS = ['MULTIPLIER']
+_NUMBER_PATTERN = re.compile(r'[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?')
 
-    # Extract anomalies for output
-    anomalies = data_cleaned[data_cleaned['ANOMALY']]
+def _upload_kind(uploaded_file):
+    """Detect an upload's format ('xlsx', 'xls', 'parquet' or 'csv') from its first bytes."""
+    if isinstance(uploaded_file, (str, os.PathLike)):
+        with open(uploaded_file, 'rb') as f:
+            head = f.read(8)
+    else:
+        uploaded_file.seek(0)
+        head = uploaded_file.read(8)
+        uploaded_file.seek(0)
+    if head.startswith(b'PK\x03\x04'):
+        return 'xlsx'
+    if head.startswith(b'\xd0\xcf\x11\xe0'):
+        return 'xls'
+    if head.startswith(b'PAR1'):
+        return 'parquet'
+    return 'csv'
 
-    # Define the Controlled Anomaly condition
-    def apply_controlled_anomaly_condition(group):
-        avg = group['Average'].mean()  # Calculate the average for the group
-        group['Controlled_Anomaly'] = group.apply(
-            lambda row: -50 <= (avg - row['VALUE_NUMERIC']) <= 50, axis=1
-        )  # Check if the difference between average and VALUE_NUMERIC is in the controlled range
-        return group
+@functools.lru_cache(maxsize=1)
+def _excel_engine():
+    """Return 'calamine' when python-calamine is installed, else None (pandas' default engine)."""
+    try:
+        import python_calamine  # noqa: F401
+        return 'calamine'
+    except ImportError:
+        return None
 
-    # Apply the Controlled Anomaly condition to each group
-    data_cleaned = data_cleaned.groupby('GROUP', group_keys=False).apply(apply_controlled_anomaly_condition)
+def _rewound(uploaded_file):
+    if not isinstance(uploaded_file, (str, os.PathLike)):
+        uploaded_file.seek(0)
+    return uploaded_file
 
-    # Filter out anomalies that are within the controlled range (if Controlled_Anomaly is True)
-    anomalies = data_cleaned[(data_cleaned['ANOMALY']) & (~data_cleaned['Controlled_Anomaly'])]
-
-    # Define output columns, including the Controlled_Anomaly column
-    output_columns = [
-        pl_name_col,
-        fet_name_col,
-        VALUE_ID_col,
-        value_col,
-        'VALUE_NUMERIC',
-        unit_col,
-        'Average',
-        'Median',
-        'GROUP',
-        'ANOMALY',
-        'ANOMALY_REASON'
-    ]
+def read_upload_columns(uploaded_file):
+    """Return the column names of an upload, reading only its header."""
+    kind = _upload_kind(uploaded_file)
+    if kind == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(_rewound(uploaded_file)).names
+    if kind == 'csv':
+        return list(pd.read_csv(_rewound(uploaded_file), nrows=0).columns)
+    return list(pd.read_excel(_rewound(uploaded_file), nrows=0, engine=_excel_engine()).columns)
 
-    st.success(f"🎯 Anomaly detection completed! Found {len(anomalies)} anomalies.")
-    
-    return anomalies[output_columns]
+def _excel_typed_cells(values):
+    """Turn numeric-looking text cells into int/float like Excel cells, converting each distinct text once."""
+    codes, uniques = pd.factorize(values)
+    typed = np.empty(len(uniques), dtype=object)
+    for i, text in enumerate(uniques):
+        text = text.strip()
+        if not _NUMBER_PATTERN.fullmatch(text):
+            typed[i] = uniques[i]
+            continue
+        number = float(text)
+        # Whole numbers come back as int, as pandas reads them from Excel
+        typed[i] = int(number) if number.is_integer() else number
+    result = np.full(len(values), np.nan, dtype=object)
+    result[codes >= 0] = typed[codes[codes >= 0]]
+    return pd.Series(result, index=values.index, name=values.name)
+
+def read_upload(uploaded_file, columns):
+    """Read the `columns` (those present) of an uploaded Excel, CSV or Parquet file."""
+    kind = _upload_kind(uploaded_file)
+    if kind == 'parquet':
+        present = [c for c in read_upload_columns(uploaded_file) if c in columns]
+        return pd.read_parquet(_rewound(uploaded_file), columns=present)
+    if kind == 'csv':
+        data = pd.read_csv(_rewound(uploaded_file), usecols=lambda c: c in columns, dtype=str)
+        if 'VALUE' in data.columns:
+            data['VALUE'] = _excel_typed_cells(data['VALUE'])
+        return data
+    return pd.read_excel(_rewound(uploaded_file), usecols=lambda c: c in columns, engine=_excel_engine())
+
+def read_uploaded_values(uploaded_file):
+    """Read the columns of an uploaded values file that validation uses."""
+    return read_upload(uploaded_file, UPLOAD_VALUE_COLUMNS + UPLOAD_OPTIONAL_COLUMNS)
 
-def validate_uploaded_values(uploaded_file):
+@profiled
+def validate_uploaded_values(uploaded_file, reporter=None, db_path=None):
     """Validate uploaded values against the database"""
-    
+    reporter = get_reporter(reporter)
+
     # Load the main database using environment variables
-    db_file_path = os.path.join(DATA_DIR, DB_FILENAME)
+    db_file_path = db_path or os.path.join(DATA_DIR, DB_FILENAME)
     approved_file_path = os.path.join(DATA_DIR, APPROVED_FILENAME)
     
     try:
-        db_data = pd.read_excel(db_file_path)
-        st.success(f"✅ Database loaded successfully! Found {len(db_data)} records.")
+        with profile_stage('Load DB statistics') as stage:
+            group_stats = load_group_stats_index(db_file_path)
+            stage['rows_out'] = len(group_stats)
+        reporter.success(f"✅ Database statistics loaded successfully! Found {len(group_stats)} groups.")
     except Exception as e:
-        st.error(f"❌ Error loading database: {str(e)}")
+        reporter.error(f"❌ Error loading database: {str(e)}")
         return None
     
-    # Load uploaded file
+    # Check required columns from the header, before the rows are parsed
     try:
-        uploaded_data = pd.read_excel(uploaded_file)
-        st.success(f"✅ Uploaded file loaded successfully! Found {len(uploaded_data)} records.")
+        with profile_stage('Check upload header'):
+            upload_columns = read_upload_columns(uploaded_file)
     except Exception as e:
-        st.error(f"❌ Error loading uploaded file: {str(e)}")
+        reporter.error(f"❌ Error loading uploaded file: {str(e)}")
         return None
-    
-    # Exclude approved anomalies
-    approved_df = load_approved_anomalies(approved_file_path)
-    if not approved_df.empty:
-        uploaded_data = uploaded_data.merge(approved_df, on=['PL_NAME', 'FET_NAME', 'VALUE'], how='left', indicator=True)
-        uploaded_data = uploaded_data[uploaded_data['_merge'] == 'left_only'].drop(columns=['_merge'])
-    
-    # Check required columns
-    required_columns = ['PL_NAME', 'FET_NAME','VALUE', 'UNIT']
-    missing_columns = [col for col in required_columns if col not in uploaded_data.columns]
+    missing_columns = [col for col in UPLOAD_VALUE_COLUMNS if col not in upload_columns]
     
     if missing_columns:
-        st.error(f"❌ Missing required columns: {missing_columns}")
-        st.info("Required columns: PL_NAME, FET_NAME, VALUE, UNIT")
+        reporter.error(f"❌ Missing required columns: {missing_columns}")
+        reporter.info("Required columns: PL_NAME, FET_NAME, VALUE, UNIT")
         return None
+
+    # Load uploaded file
+    try:
+        with profile_stage('Load upload') as stage:
+            uploaded_data = read_uploaded_values(uploaded_file)
+            stage['rows_out'] = len(uploaded_data)
+        reporter.success(f"✅ Uploaded file loaded successfully! Found {len(uploaded_data)} records.")
+    except Exception as e:
+        reporter.error(f"❌ Error loading uploaded file: {str(e)}")
+        return None
+
+    with profile_stage('Load approved anomalies') as stage:
+        approved_keys = get_approved_keys(approved_file_path)
+        stage['rows_out'] = len(approved_keys)
+
+    model_set = None
+    if VALIDATION_SCORER == 'isolation_forest':
+        model_set = open_group_model_set(group_model_set_id(db_file_path))
+        if model_set is None:
+            reporter.warning("⚠️ No Isolation Forest models for this database version yet; run the entire database analysis to create them. Using the 3-sigma check meanwhile.")
+    return check_uploaded_values(uploaded_data, group_stats, approved_keys, reporter, model_set=model_set)
+
+def check_uploaded_values(uploaded_data, group_stats, approved_keys, reporter=None, model_set=None):
+    """Validate loaded upload rows against the per-GROUP DB statistics and return the result rows.
+
+    With a `model_set`, values of GROUPs that have a saved Isolation Forest model are scored by
+    it; the others keep the 3-sigma check.
+    """
+    reporter = get_reporter(reporter)
+
+    # Exclude approved anomalies
+    with profile_stage('Exclude approved anomalies', rows_in=len(uploaded_data)) as stage:
+        uploaded_data = exclude_approved_anomalies(uploaded_data, approved_keys)
+        stage['rows_out'] = len(uploaded_data)
     
     # Clean and preprocess uploaded data
-    uploaded_cleaned = uploaded_data.dropna().copy()
-    st.info(f"📊 After cleaning uploaded data: {len(uploaded_cleaned)} records remaining")
+    with profile_stage('Clean', rows_in=len(uploaded_data)) as stage:
+        uploaded_cleaned = uploaded_data.dropna().copy()
+        stage['rows_out'] = len(uploaded_cleaned)
+    reporter.info(f"📊 After cleaning uploaded data: {len(uploaded_cleaned)} records remaining")
     
     # Combine PL_NAME and FET_NAME to create a unique group identifier
-    uploaded_cleaned['GROUP'] = uploaded_cleaned['PL_NAME'].astype(str) + '_' + uploaded_cleaned['FET_NAME'].astype(str)
-    
-    # Convert VALUE to numeric
-    uploaded_cleaned['VALUE_NUMERIC'] = pd.to_numeric(uploaded_cleaned['VALUE'], errors='coerce')
-    uploaded_cleaned['is_numeric'] = uploaded_cleaned['VALUE_NUMERIC'].notna()
+    with profile_stage('Build groups', rows_in=len(uploaded_cleaned)):
+        uploaded_cleaned['GROUP'] = build_group_column(uploaded_cleaned['PL_NAME'], uploaded_cleaned['FET_NAME'])
     
-    # Define custom logic for majority check
-    def custom_majority_check(value):
-        if pd.notna(value) and any(sub in str(value) for sub in ['|', '/', 'to', '!', ' '] ):
-            return True
-        return pd.notna(pd.to_numeric(value, errors='coerce'))
-    
-    uploaded_cleaned['is_numeric_majority'] = uploaded_cleaned['VALUE'].apply(custom_majority_check)
-    
-    # Define valid units (same as in main function)
-    valid_units = {
-        'Current': ['A'],
-        'Voltage': ['V'],
-        'Weight': ['g','lb', 'oz'],
-        'Frequency': ['Hz'],
-        'Resistance': ['Ohm'],
-        'Power': ['W','dB','VA','HP'],
-        'Capacitance': ['F'],
-        'Impedance': ['Ohm'],
-        'Gain': ['dB'],
-        'Thermal': ['c', 'k', '°'] ,
-        'Temperature': ['c', 'k', '°'] ,
-        'Tolerance': ['%','ppm','ppb'] ,
-        'Ratio': ['%'] ,
-        'Efficiency': ['%'] ,
-        'Aging': ['Year','ppm'] ,
-        'Noise': ['db','ppm'] ,
-        'Stability': ['ppm'] ,
-        'Sensitivity': ['db'] ,
-        'Gain Bandwidth': ['Hz'] ,
-        'Breaking Capacity': ['A'] ,
-        'Gain Attenuation': ['dB'] ,
-        'Loss': ['dB'],
-        'Mean Spherical Candle Power': ['MSCP'],
-        'Minimum Isolation Voltage' : ['db'] , 
-          'Current': ['A'], 'Voltage': ['V'], 'Weight': ['g','lb', 'oz'], 'Frequency': ['Hz'],
-        'Resistance': ['Ohm'], 'Power': ['W','dB','VA','HP'], 'Capacitance': ['F'], 'Impedance': ['Ohm'],
-        'Gain': ['dB'], 'Thermal': ['c', 'k', '°'], 'Temperature': ['c', 'k', '°'],
-        'Tolerance': ['%','ppm','ppb'], 'Ratio': ['%'], 'Efficiency': ['%'], 'Aging': ['Year','ppm'],
-        'Noise': ['db','ppm'], 'Stability': ['ppm'], 'Sensitivity': ['db'], 'Gain Bandwidth': ['Hz'],
-        'Breaking Capacity': ['A'], 'Gain Attenuation': ['dB'], 'Loss': ['dB'], 'Mean Spherical Candle Power': ['MSCP'],
-        'Minimum Isolation Voltage' : ['db'] ,
-        'time' : ['s','min','h','ns','d','month','year',''],
-        'color': [''],
-        'depth': ['m','cm','mm','in','ft','mile'],
-        'height' : ['m','cm','mm','in','ft','mile'],
-        'length' : ['m','cm','mm','in','ft','mile'],
-        'size' : ['m','cm','mm','in','gallon','AWG','b','B','bit','byte','oz','word','pixel','cc','ounce'],
-        'Rate' : [    'bps', 'sps', 'N/mm', 'Hz', 'V/us', 'SCFM|GPH', 'r/min', 'bE', 'lbs/in', 'N.mm/deg', 'WPS', 'L/min', 'Bd', 'fps', 'Gbps', 'lb/in', 'L/sec', 'm³/h', 'gpm', 'slm', 'slpm', 
-        'sccm', 'g', 'SPS', 'm/s', 'ft/min', 'scfh', 'Grms', 'ft²/min', 
-        'Gs', 's', '', 'Tps', 'baud', 'CFM', 'rpm'] ,
-        'Material': ['','  '],
-        'Diameter' : ['m','cm','mm','in','ft','mile'],
-        'speed' : ['m/s','km/h','mph','hz','kph','rpm','pbs','rps','cm/s','ft/s','G','Sec','bps'],
-        'width' : ['m','cm','mm','in','ft','mile','°','pbs','hz'],
-        'dimension' : ['m'],
-        'thickness' : ['m','in'],
-        'mounting' : ['m','in',''],
-        'Coefficient' : ['%'],
-        'noise': ['dB','db','ppm','%'],
-        'gender': [''],
-        'Supported Device' :['','  '],
-        'area' : ['m2','cm2','mm2','inch2','ft2','acre'],
-        'volume' : ['m3','cm3','mm3','inch3','ft3','liter'],
-        'pressure' : ['Pa','kPa','MPa','bar','psi'],
-        'energy' : ['J','kJ','cal','Wh','kWh'],
-        'power' : ['W','kW','MW'],
-        'torque' : ['Nm','lb-ft','kg-m'],
-        'force' : ['N','kN','lb','kg'],
-        'acceleration' : ['m/s2','g'],
-        'density' : ['kg/m3','g/cm3','lb/in3'] ,
-        'type': ['','°','bit',' '],
-        'Bandwidth' : ['Hz','bps'],
-        'number' : ['','Turns','key','byte','b',' ']
-    }
-    
-    # Function to validate units
-    def is_valid_unit(unit, fet_name):
-        if pd.isna(unit):
-            return False
-        unit_parts = str(unit).lower().split('|')
-        unit_valid = False
-        for part in unit_parts:
-            part = part.strip()
-            for key, units in valid_units.items():
-                if key.lower() in str(fet_name).lower():
-                    if any(valid_unit.lower() in part for valid_unit in units):
-                        unit_valid = True
-                        break
-        return unit_valid
-    
-    # Initialize validation columns
-    uploaded_cleaned['ANOMALY'] = False
-    uploaded_cleaned['ANOMALY_REASON'] = ''
-    uploaded_cleaned['VALIDATION_STATUS'] = 'Valid'
+    # Convert VALUE to numeric and classify numeric-like values
+    with profile_stage('Classify values', rows_in=len(uploaded_cleaned)):
+        classified = classify_values(uploaded_cleaned['VALUE'])
+        for col in ['VALUE_NUMERIC', 'is_numeric', 'is_numeric_majority']:
+            uploaded_cleaned[col] = classified[col]
     
     # Validate units
-    invalid_unit_mask = ~uploaded_cleaned.apply(lambda row: is_valid_unit(row['UNIT'], row['FET_NAME']), axis=1)
-    uploaded_cleaned.loc[invalid_unit_mask, 'ANOMALY'] = True
-    uploaded_cleaned.loc[invalid_unit_mask, 'ANOMALY_REASON'] += 'Invalid unit for measurement; '
-    uploaded_cleaned.loc[invalid_unit_mask, 'VALIDATION_STATUS'] = 'Invalid'
-    
-    # Validate against database groups
-    db_cleaned = db_data.dropna().copy()
-    db_cleaned['GROUP'] = db_cleaned['PL_NAME'].astype(str) + '_' + db_cleaned['FET_NAME'].astype(str)
-    db_cleaned['VALUE_NUMERIC'] = pd.to_numeric(db_cleaned['VALUE'], errors='coerce')
-    
-    # For each uploaded record, check if it's an outlier compared to database
-    for idx, row in uploaded_cleaned.iterrows():
-        group = row['GROUP']
-        db_group_data = db_cleaned[db_cleaned['GROUP'] == group]
-        
-        if len(db_group_data) > 0:
-            db_values = db_group_data['VALUE_NUMERIC'].dropna()
-            
-            if len(db_values) > 0 and pd.notna(row['VALUE_NUMERIC']):
-                # Calculate statistics from database
-                db_mean = db_values.mean()
-                db_std = db_values.std()
-                
-                # Check if uploaded value is an outlier (beyond 3 standard deviations)
-                if abs(row['VALUE_NUMERIC'] - db_mean) > 3 * db_std:
-                    uploaded_cleaned.loc[idx, 'ANOMALY'] = True
-                    uploaded_cleaned.loc[idx, 'ANOMALY_REASON'] += 'Outlier compared to database; '
-                    uploaded_cleaned.loc[idx, 'VALIDATION_STATUS'] = 'Outlier'
-                
-                # Add database statistics
-                uploaded_cleaned.loc[idx, 'DB_MEAN'] = db_mean
-                uploaded_cleaned.loc[idx, 'DB_STD'] = db_std
-                uploaded_cleaned.loc[idx, 'DB_COUNT'] = len(db_values)
-            else:
-                uploaded_cleaned.loc[idx, 'DB_MEAN'] = None
-                uploaded_cleaned.loc[idx, 'DB_STD'] = None
-                uploaded_cleaned.loc[idx, 'DB_COUNT'] = 0
-        else:
-            uploaded_cleaned.loc[idx, 'ANOMALY'] = True
-            uploaded_cleaned.loc[idx, 'ANOMALY_REASON'] += 'Group not found in database; '
-            uploaded_cleaned.loc[idx, 'VALIDATION_STATUS'] = 'Not Found'
-            uploaded_cleaned.loc[idx, 'DB_MEAN'] = None
-            uploaded_cleaned.loc[idx, 'DB_STD'] = None
-            uploaded_cleaned.loc[idx, 'DB_COUNT'] = 0
+    with profile_stage('Unit validation', rows_in=len(uploaded_cleaned)) as stage:
+        invalid_unit_mask = find_invalid_units(uploaded_cleaned, 'UNIT', 'FET_NAME', get_unit_rules()).to_numpy()
+        flags = add_reason_flag(np.zeros(len(uploaded_cleaned), dtype=np.uint16), invalid_unit_mask, 'Invalid unit for measurement')
+        stage['rows_out'] = int(invalid_unit_mask.sum())
     
-    # Clean up anomaly reason column
-    uploaded_cleaned['ANOMALY_REASON'] = uploaded_cleaned['ANOMALY_REASON'].str.rstrip('; ').replace('', 'No issues found')
+    # Validate against database groups with one join on the per-GROUP statistics index
+    with profile_stage('Database comparison', rows_in=len(uploaded_cleaned)) as stage:
+        groups = uploaded_cleaned['GROUP'].cat
+        db_stats = group_stats.reindex(groups.categories)
+        group_found = db_stats.index.isin(group_stats.index)[groups.codes]
+        db_count = db_stats['DB_COUNT'].to_numpy()[groups.codes]
+        db_mean = db_stats['DB_MEAN'].to_numpy()[groups.codes]
+        db_std = db_stats['DB_STD'].to_numpy()[groups.codes]
+        value_numeric = uploaded_cleaned['VALUE_NUMERIC'].to_numpy(dtype=float)
+        has_stats = group_found & (db_count > 0) & ~np.isnan(value_numeric)
+
+        # Score values of GROUPs with a saved model by it, without refitting
+        model_rows = np.zeros(len(uploaded_cleaned), dtype=bool)
+        model_outliers = np.zeros(len(uploaded_cleaned), dtype=bool)
+        if model_set is not None:
+            models = model_set.load(groups.categories)
+            codes = groups.codes.to_numpy()
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(groups.categories) + 1))
+            for code, name in enumerate(groups.categories):
+                if name in models:
+                    rows = order[bounds[code]:bounds[code + 1]]
+                    rows = rows[~np.isnan(value_numeric[rows])]
+                    model_rows[rows] = True
+                    model_outliers[rows] = predict_group_model(value_numeric[rows], *models[name])
+
+        # Check if uploaded value is an outlier (beyond 3 standard deviations)
+        outlier_mask = has_stats & ~model_rows & (np.abs(value_numeric - db_mean) > 3 * db_std)
+        flags = add_reason_flag(flags, model_outliers, 'Isolation Forest anomaly detected')
+        flags = add_reason_flag(flags, outlier_mask, 'Outlier compared to database')
+        flags = add_reason_flag(flags, ~group_found, 'Group not found in database')
+        outlier_mask |= model_outliers
+        stage['rows_out'] = int(outlier_mask.sum() + (~group_found).sum())
+
+    # Build validation columns, rendering the reason text once per flag combination
+    with profile_stage('Build report', rows_in=len(uploaded_cleaned)) as stage:
+        uploaded_cleaned['ANOMALY'] = flags != 0
+        uploaded_cleaned['ANOMALY_REASON'] = render_anomaly_reasons(flags, 'No issues found')
+        uploaded_cleaned['VALIDATION_STATUS'] = np.select(
+            [~group_found, outlier_mask, invalid_unit_mask], ['Not Found', 'Outlier', 'Invalid'], default='Valid'
+        ).astype(object)
+
+        # Add database statistics
+        uploaded_cleaned['DB_MEAN'] = np.where(has_stats, db_mean, np.nan)
+        uploaded_cleaned['DB_STD'] = np.where(has_stats, db_std, np.nan)
+        uploaded_cleaned['DB_COUNT'] = np.where(has_stats, db_count, 0)
+        uploaded_cleaned = from_categoricals(uploaded_cleaned)
+        stage['rows_out'] = len(uploaded_cleaned)
     
-    st.success(f"🎯 Validation completed! Found {uploaded_cleaned['ANOMALY'].sum()} issues in uploaded data.")
+    reporter.success(f"🎯 Validation completed! Found {uploaded_cleaned['ANOMALY'].sum()} issues in uploaded data.")
     
     return uploaded_cleaned
 
-def load_approved_anomalies(approved_file_path):
-    """Load approved anomalies from the master file."""
+# --- Approved anomaly store ---
+# Approved anomalies are matched on a 64-bit hash of (PL_NAME, FET_NAME, VALUE) and kept in a
+# SQLite database with the hash as primary key, so inserts are atomic and de-duplicated in
+# O(upload size) even with several users uploading at once. Rows from the master workbook are
+# re-imported whenever the workbook changes; rows added through the app are kept in the store.
+APPROVED_KEY_COLUMNS = ['PL_NAME', 'FET_NAME', 'VALUE']
+
+def _normalized_key_part(value):
+    """Normalize a key cell so hashes compare like a pandas merge does (5 == 5.0, but '5' != 5)."""
+    if isinstance(value, str):
+        return 's:' + value
+    if value is None or value is pd.NaT:
+        return 'null'
+    if isinstance(value, (bool, int, float, np.number)):
+        return 'null' if pd.isna(value) else f'n:{float(value)!r}'
+    return f'o:{value}'
+
+def approved_key_hashes(frame):
+    """Return the uint64 approved-anomaly key of every row, hashing each distinct cell value once."""
+    keys = np.zeros(len(frame), dtype=np.uint64)
+    for col in APPROVED_KEY_COLUMNS:
+        codes, uniques = pd.factorize(frame[col])
+        # Missing values get code -1, which picks the trailing 'null' entry
+        parts = np.array([_normalized_key_part(value) for value in uniques] + ['null'], dtype=object)
+        keys = pd.util.hash_array(keys ^ pd.util.hash_array(parts)[codes])
+    return keys
+
+def _read_approved_workbook(approved_file_path):
+    """Read the key columns of the master workbook, or an empty frame if it is missing or unreadable."""
     if os.path.exists(approved_file_path):
         try:
-            approved_df = pd.read_excel(approved_file_path)
-            return approved_df
+            return pd.read_excel(approved_file_path)[APPROVED_KEY_COLUMNS]
         except Exception as e:
-            st.warning(f"⚠️ Could not load approved anomalies: {str(e)}")
-            return pd.DataFrame(columns=['PL_NAME', 'FET_NAME', 'VALUE'])
+            get_reporter().warning(f"⚠️ Could not load approved anomalies: {str(e)}")
+    return pd.DataFrame(columns=APPROVED_KEY_COLUMNS)
+
+def _sql_value(value):
+    """Convert a cell to a value SQLite can store, keeping text and numbers apart."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NaT:
+        return None
+    if isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+def open_approved_store(store_path=None):
+    """Open the approved-anomaly store, creating it if needed."""
+    store_path = store_path or APPROVED_STORE_FILE
+    os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+    # Autocommit mode: write transactions are opened explicitly with BEGIN IMMEDIATE
+    conn = sqlite3.connect(store_path, timeout=30, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS approved_anomalies ('
+        'KEY INTEGER PRIMARY KEY, SOURCE TEXT NOT NULL, PL_NAME, FET_NAME, VALUE, ADDED_AT TEXT)'
+    )
+    conn.execute('CREATE TABLE IF NOT EXISTS store_meta (NAME TEXT PRIMARY KEY, VALUE TEXT)')
+    return conn
+
+def _get_store_meta(conn, name, default=None):
+    row = conn.execute('SELECT VALUE FROM store_meta WHERE NAME = ?', (name,)).fetchone()
+    return json.loads(row[0]) if row else default
+
+def _set_store_meta(conn, name, value):
+    conn.execute('INSERT OR REPLACE INTO store_meta (NAME, VALUE) VALUES (?, ?)', (name, json.dumps(value)))
+
+def approved_store_version(conn):
+    """Return the store version, bumped by every write transaction."""
+    return _get_store_meta(conn, 'version', 0)
+
+def _insert_approved_rows(conn, frame, source):
+    """Insert rows into the store inside the caller's transaction. Returns the number of new keys."""
+    # SQLite integers are signed 64-bit, so the uint64 keys are stored with the same bit pattern
+    keys = approved_key_hashes(frame).view(np.int64).tolist()
+    added_at = datetime.now().isoformat(timespec='seconds')
+    records = [
+        (key, source, _sql_value(pl_name), _sql_value(fet_name), _sql_value(value), added_at)
+        for key, pl_name, fet_name, value in zip(keys, frame['PL_NAME'], frame['FET_NAME'], frame['VALUE'])
+    ]
+    before = conn.execute('SELECT COUNT(*) FROM approved_anomalies').fetchone()[0]
+    if source == 'workbook':
+        conn.executemany('INSERT OR IGNORE INTO approved_anomalies VALUES (?, ?, ?, ?, ?, ?)', records)
     else:
-        return pd.DataFrame(columns=['PL_NAME', 'FET_NAME', 'VALUE'])
+        # Rows approved through the app survive a later re-import of the workbook
+        conn.executemany(
+            'INSERT INTO approved_anomalies VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(KEY) DO UPDATE SET SOURCE = excluded.SOURCE',
+            records
+        )
+    _set_store_meta(conn, 'version', approved_store_version(conn) + 1)
+    return conn.execute('SELECT COUNT(*) FROM approved_anomalies').fetchone()[0] - before
+
+def _workbook_unchanged(conn, workbook):
+    imported = _get_store_meta(conn, 'workbook_fingerprint', {})
+    if not workbook:
+        return not imported
+    return (workbook['mtime_ns'], workbook['size']) == (imported.get('mtime_ns'), imported.get('size'))
+
+def sync_approved_store(conn, approved_file_path):
+    """Re-import the master workbook into the store if it changed since the last import."""
+    workbook = _file_fingerprint(approved_file_path) if os.path.exists(approved_file_path) else {}
+    if _workbook_unchanged(conn, workbook):
+        return False
+    if workbook:
+        workbook = _file_fingerprint(approved_file_path, with_hash=True)
+    workbook_rows = _read_approved_workbook(approved_file_path)
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        imported = _get_store_meta(conn, 'workbook_fingerprint', {})
+        if workbook.get('sha256') != imported.get('sha256'):
+            conn.execute("DELETE FROM approved_anomalies WHERE SOURCE = 'workbook'")
+            _insert_approved_rows(conn, workbook_rows, 'workbook')
+        _set_store_meta(conn, 'workbook_fingerprint', workbook)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return True
+
+@st.cache_resource
+def _approved_keys_cache():
+    """Process-wide cache of the sorted approved-anomaly keys, tagged with the store version."""
+    return {}
+
+def get_approved_keys(approved_file_path, store_path=None):
+    """Return the sorted approved-anomaly keys, reloading them only when the store version changed."""
+    store_path = store_path or APPROVED_STORE_FILE
+    conn = open_approved_store(store_path)
+    try:
+        sync_approved_store(conn, approved_file_path)
+        version = approved_store_version(conn)
+        cache = _approved_keys_cache()
+        entry = cache.get(store_path)
+        if entry is None or entry['version'] != version:
+            keys = np.array([row[0] for row in conn.execute('SELECT KEY FROM approved_anomalies')], dtype=np.int64)
+            entry = {'keys': np.sort(keys.view(np.uint64)), 'version': version}
+            cache[store_path] = entry
+        return entry['keys']
+    finally:
+        conn.close()
+
+def load_approved_anomalies(approved_file_path):
+    """Load approved anomalies from the master file."""
+    conn = open_approved_store()
+    try:
+        sync_approved_store(conn, approved_file_path)
+        rows = conn.execute('SELECT PL_NAME, FET_NAME, VALUE FROM approved_anomalies ORDER BY ADDED_AT, rowid').fetchall()
+    finally:
+        conn.close()
+    return pd.DataFrame.from_records(rows, columns=APPROVED_KEY_COLUMNS)
+
+def export_approved_anomalies(approved_file_path, output):
+    """Write all approved anomalies to an Excel file path or buffer."""
+    approved_df = load_approved_anomalies(approved_file_path)
+    approved_df.to_excel(output, index=False)
+    return len(approved_df)
 
 def append_approved_anomalies(uploaded_file, approved_file_path):
-    """Append uploaded approved anomalies to the master file."""
+    """Append uploaded approved anomalies to the approved-anomaly store."""
     try:
-        uploaded_df = pd.read_excel(uploaded_file)
-        # Ensure correct columns
-        required_cols = ['PL_NAME', 'FET_NAME', 'VALUE']
-        if not all(col in uploaded_df.columns for col in required_cols):
+        # Ensure correct columns from the header, before the rows are parsed
+        required_cols = APPROVED_KEY_COLUMNS
+        if not all(col in read_upload_columns(uploaded_file) for col in required_cols):
             st.error(f"❌ Uploaded file must have columns: {required_cols}")
             return False
-        approved_df = load_approved_anomalies(approved_file_path)
-        combined_df = pd.concat([approved_df, uploaded_df], ignore_index=True).drop_duplicates()
-        combined_df.to_excel(approved_file_path, index=False)
-        st.success(f"✅ Approved anomalies updated! Total records: {len(combined_df)}")
+        uploaded_df = read_upload(uploaded_file, required_cols)
+        conn = open_approved_store()
+        try:
+            sync_approved_store(conn, approved_file_path)
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                added = _insert_approved_rows(conn, uploaded_df, 'upload')
+                total = conn.execute('SELECT COUNT(*) FROM approved_anomalies').fetchone()[0]
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+        st.success(f"✅ Approved anomalies updated! {added} new, total records: {total}")
         return True
     except Exception as e:
         st.error(f"❌ Error updating approved anomalies: {str(e)}")
         return False
 
+# --- Report export ---
+# Reports are written once, streaming row by row, and downloads are served from the saved
+# file. Excel sheets hold at most 1,048,576 rows, so larger reports continue on extra sheets.
+REPORT_FORMATS = ('xlsx', 'csv', 'parquet')
+REPORT_MIME_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+EXCEL_MAX_ROWS = 1048576
+EXPORT_CHUNK_ROWS = 50000
+
+def _report_row_chunks(df):
+    """Yield the report rows as lists of plain Python values, EXPORT_CHUNK_ROWS at a time."""
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS].astype(object)
+        yield chunk.where(chunk.notna(), None).values.tolist()
+
+def _openpyxl_text_cell(sheet, value):
+    """Keep text starting with '=' as text in openpyxl's write-only mode instead of a formula."""
+    if isinstance(value, str) and value.startswith('='):
+        from openpyxl.cell import WriteOnlyCell
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.data_type = 's'
+        return cell
+    return value
+
+def _write_excel_report(df, path, sheet_name):
+    """Write an Excel report in constant memory (xlsxwriter, else openpyxl's write-only mode)."""
+    header = [str(col) for col in df.columns]
+    rows_per_sheet = EXCEL_MAX_ROWS - 1
+    sheets = max(1, math.ceil(len(df) / rows_per_sheet))
+    sheet_names = [sheet_name] + [f'{sheet_name}_{number}' for number in range(2, sheets + 1)]
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+
+    if xlsxwriter is not None:
+        # Cell text is data: never turn it into formulas or hyperlinks
+        workbook = xlsxwriter.Workbook(path, {
+            'constant_memory': True, 'strings_to_formulas': False, 'strings_to_urls': False,
+            'nan_inf_to_errors': True,
+        })
+        add_sheet = workbook.add_worksheet
+    else:
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        add_sheet = workbook.create_sheet
+
+    def start_sheet(index):
+        sheet = add_sheet(sheet_names[index])
+        if xlsxwriter is not None:
+            sheet.write_row(0, 0, header)
+        else:
+            sheet.append(header)
+        return sheet
+
+    try:
+        sheet_index, row_number = 0, 0
+        sheet = start_sheet(sheet_index)
+        for chunk in _report_row_chunks(df):
+            for row in chunk:
+                if row_number == rows_per_sheet:
+                    sheet_index, row_number = sheet_index + 1, 0
+                    sheet = start_sheet(sheet_index)
+                row_number += 1
+                if xlsxwriter is not None:
+                    sheet.write_row(row_number, 0, row)
+                else:
+                    sheet.append([_openpyxl_text_cell(sheet, value) for value in row])
+    finally:
+        if xlsxwriter is not None:
+            workbook.close()
+        else:
+            workbook.save(path)
+
+def write_report(df, path, fmt='xlsx', sheet_name='Anomalies'):
+    """Write a report frame to `path` as xlsx, csv or parquet, without building it in memory first."""
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format '{fmt}', expected one of {list(REPORT_FORMATS)}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Write next to the target and rename, so a download never serves a partial file
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        if fmt == 'xlsx':
+            _write_excel_report(df, tmp_path, sheet_name)
+        elif fmt == 'csv':
+            df.to_csv(tmp_path, index=False, chunksize=EXPORT_CHUNK_ROWS)
+        else:
+            # Columns mixing text and numbers (e.g. VALUE) are written as text
+            encoded = _encode_mixed_columns(df)
+            encoded.drop(columns=[c for c in encoded.columns if c.endswith(_KIND_SUFFIX)]).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+# --- Background jobs ---
+# Scans and validations run on a worker pool shared by all sessions, so widget interaction
+# no longer interrupts them and identical requests already in flight are not started twice.
+# Job metadata and results are written to JOBS_DIR and survive reruns, sessions and restarts.
+class JobReporter(LogReporter):
+    """Reporter that records pipeline messages on a job for the UI to replay."""
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+
+    def success(self, message):
+        self.job['messages'].append(['success', message])
+        super().success(message)
+
+    def info(self, message):
+        self.job['messages'].append(['info', message])
+        super().info(message)
+
+    def warning(self, message):
+        self.job['messages'].append(['warning', message])
+        super().warning(message)
+
+    def error(self, message):
+        self.job['messages'].append(['error', message])
+        super().error(message)
+
+class JobManager:
+    """Run scans and validations on a thread pool and persist their results in `jobs_dir`."""
+
+    def __init__(self, workers=None, jobs_dir=None):
+        self.jobs_dir = jobs_dir or JOBS_DIR
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=workers or JOB_WORKERS, thread_name_prefix='anomaly-job')
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.in_flight = {}
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.jobs_dir, f'{job_id}{suffix}')
+
+    def _save(self, job):
+        with self.lock:
+            snapshot = json.dumps(job)
+        tmp_path = self._path(job['id'], f'.json.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self._path(job['id'], '.json'))
+
+    def submit(self, kind, dedupe_key, fn, *args, report_format='xlsx', **kwargs):
+        """Queue `fn(*args, reporter=..., **kwargs)` and return its job ID.
+
+        If a job with the same `dedupe_key` and report format is still queued or running,
+        its ID is returned instead.
+        """
+        dedupe_key = (dedupe_key, report_format)
+        with self.lock:
+            if dedupe_key in self.in_flight:
+                return self.in_flight[dedupe_key]
+            job_id = f"{kind}-{datetime.now().strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:6]}"
+            job = {
+                'id': job_id, 'kind': kind, 'status': 'queued', 'created': datetime.now().isoformat(timespec='seconds'),
+                'started': None, 'finished': None, 'messages': [], 'rows': None, 'report_file': None,
+                'report_format': report_format,
+            }
+            self.jobs[job_id] = job
+            self.in_flight[dedupe_key] = job_id
+        self._save(job)
+        self.executor.submit(self._run, job, dedupe_key, fn, args, kwargs)
+        self.prune()
+        return job_id
+
+    def prune(self, keep=None):
+        """Delete the files of all but the `keep` (default JOB_KEEP) most recently finished jobs.
+
+        Queued and running jobs are never pruned. Scan reports saved to OUTPUT_DIR are kept,
+        like the reports of the command line; their profile files are deleted with the job.
+        """
+        keep = JOB_KEEP if keep is None else keep
+        if keep <= 0:
+            return []
+        with self.lock:
+            active = set(self.in_flight.values())
+        names_by_job = {}
+        for name in os.listdir(self.jobs_dir):
+            names_by_job.setdefault(name.split('.', 1)[0], []).append(name)
+        finished = []
+        for job_id, names in names_by_job.items():
+            if job_id in active or f'{job_id}.json' not in names:
+                continue
+            try:
+                finished.append((os.stat(self._path(job_id, '.json')).st_mtime_ns, job_id))
+            except FileNotFoundError:
+                continue
+        finished.sort()
+        pruned = [job_id for _, job_id in finished[:max(0, len(finished) - keep)]]
+        for job_id in pruned:
+            job = self.get(job_id) or {}
+            paths = [os.path.join(self.jobs_dir, name) for name in names_by_job[job_id]]
+            paths += (job.get('profile') or {}).get('files') or []
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            with self.lock:
+                self.jobs.pop(job_id, None)
+        return pruned
+
+    def _run(self, job, dedupe_key, fn, args, kwargs):
+        job['status'] = 'running'
+        job['started'] = datetime.now().isoformat(timespec='seconds')
+        self._save(job)
+        profile = PipelineProfile(job['kind'])
+        try:
+            with profile.run():
+                results = fn(*args, reporter=JobReporter(job), **kwargs)
+                if results is None:
+                    job['status'] = 'failed'
+                else:
+                    with profile_stage('Save job result', rows_in=len(results)):
+                        _encode_mixed_columns(results).to_parquet(self._path(job['id'], '.parquet'), index=False)
+                    job['rows'] = len(results)
+                    if len(results) > 0:
+                        with profile_stage('Export report', rows_in=len(results)):
+                            job['report_file'] = self._write_report(job, results)
+                    job['status'] = 'done'
+        except Exception as e:
+            logger.exception("Job %s failed", job['id'])
+            job['messages'].append(['error', f"❌ {type(e).__name__}: {str(e)}"])
+            job['status'] = 'failed'
+        finally:
+            job['profile'] = profile.to_dict()
+            # The profile goes next to the report, or into the jobs directory without one
+            base_path = os.path.splitext(job['report_file'])[0] if job['report_file'] else self._path(job['id'], '')
+            try:
+                job['profile']['files'] = profile.write(base_path)
+            except Exception as e:
+                logger.warning("Could not write the profile of job %s: %s", job['id'], e)
+            job['finished'] = datetime.now().isoformat(timespec='seconds')
+            # Saved before it leaves `in_flight`, so pruning never races with this last write
+            self._save(job)
+            with self.lock:
+                self.in_flight.pop(dedupe_key, None)
+
+    def _write_report(self, job, results):
+        """Save the report offered for download (scans also keep their copy in OUTPUT_DIR)."""
+        fmt = job['report_format']
+        if job['kind'] == 'scan':
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = os.path.join(OUTPUT_DIR, f'Anomalies_Of_parametrics_{timestamp}.{fmt}')
+            sheet_name = 'Anomalies'
+        else:
+            path = self._path(job['id'], f'.{fmt}')
+            sheet_name = 'Validation_Results'
+        try:
+            write_report(results, path, fmt, sheet_name=sheet_name)
+        except Exception as e:
+            job['messages'].append(['warning', f"⚠️ Could not save to output directory: {str(e)}"])
+            return None
+        if job['kind'] == 'scan':
+            job['messages'].append(['success', f"✅ Results also saved to: {path}"])
+        return path
+
+    def get(self, job_id):
+        """Return a copy of the job's metadata, or None for an unknown job ID."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                return json.loads(json.dumps(job))
+        # Jobs from earlier server processes are read back from disk
+        path = self._path(job_id, '.json')
+        if not re.fullmatch(r'[\w-]+', job_id or '') or not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            job = json.load(f)
+        if job['status'] in ('queued', 'running'):
+            job['status'] = 'interrupted'
+        job.setdefault('report_format', 'xlsx')
+        return job
+
+    def result(self, job_id):
+        """Load the result frame of a finished job."""
+        return _decode_mixed_columns(pd.read_parquet(self._path(job_id, '.parquet')))
+
+    def result_file(self, job_id):
+        """Return the path of the Parquet file holding a finished job's result."""
+        return self._path(job_id, '.parquet')
+
+    def report_file(self, job):
+        """Return the saved report of a finished job, writing it again if it was deleted."""
+        if job['report_file'] and os.path.exists(job['report_file']):
+            return job['report_file']
+        sheet_name = 'Anomalies' if job['kind'] == 'scan' else 'Validation_Results'
+        return write_report(self.result(job['id']), self._path(job['id'], f".{job['report_format']}"),
+                            job['report_format'], sheet_name=sheet_name)
+
+@st.cache_resource
+def get_job_manager():
+    """Process-wide job manager shared by all sessions."""
+    return JobManager()
+
+def submit_scan_job(incremental=False, db_path=None, report_format='xlsx'):
+    """Submit a whole-database scan and return its job ID."""
+    db_path = db_path or os.path.join(DATA_DIR, DB_FILENAME)
+    return get_job_manager().submit(
+        'scan', ('scan', os.path.abspath(db_path), incremental), run_anomaly_detection,
+        incremental=incremental, db_path=db_path, report_format=report_format
+    )
+
+def submit_validation_job(uploaded_file, db_path=None, report_format='xlsx'):
+    """Submit a validation of an uploaded file and return its job ID."""
+    content = uploaded_file.getvalue()
+    db_path = db_path or os.path.join(DATA_DIR, DB_FILENAME)
+    dedupe_key = ('validate', os.path.abspath(db_path), hashlib.sha256(content).hexdigest())
+    return get_job_manager().submit(
+        'validate', dedupe_key, validate_uploaded_values, io.BytesIO(content),
+        db_path=db_path, report_format=report_format
+    )
+
+def _replay_job_messages(job):
+    """Show the progress messages a job recorded, as the pipeline would have shown them."""
+    for level, message in job['messages']:
+        getattr(st, level)(message)
+
+def render_job_profile(job):
+    """Show the per-stage timings a finished job recorded."""
+    profile = job.get('profile')
+    if not profile or not profile['stages']:
+        return
+    with st.expander(f"⏱️ Pipeline profile ({profile['total_seconds']:.2f}s)"):
+        stages = pd.DataFrame(profile['stages'])
+        stages['share_%'] = (100 * stages['seconds'] / max(profile['total_seconds'], 1e-9)).round(1)
+        st.dataframe(stages, use_container_width=True, hide_index=True)
+        if profile.get('files'):
+            st.caption("Saved to: " + ", ".join(profile['files']))
+
+@functools.lru_cache(maxsize=4)
+def _read_report_file(path, mtime_ns):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _job_report_bytes(job):
+    """Return the saved report file of a finished job for the download button.
+
+    The page reruns on every interaction, so the file is read once and kept until it changes.
+    """
+    path = get_job_manager().report_file(job)
+    return _read_report_file(path, os.stat(path).st_mtime_ns)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_job_progress(job_id):
+    """Poll a queued or running job and rerun the page once it has finished."""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return
+    if job['status'] not in ('queued', 'running'):
+        st.rerun()
+    last_message = job['messages'][-1][1] if job['messages'] else "Waiting for a free worker..."
+    st.info(f"⏳ Job `{job_id}` is {job['status']}. {last_message}")
+
+def _current_job(kind):
+    """Return the job of `kind` this page last submitted (kept in the URL across reloads)."""
+    job_id = st.session_state.get(f'{kind}_job_id') or st.query_params.get(f'{kind}_job')
+    return get_job_manager().get(job_id) if job_id else None
+
+def _track_job(kind, job_id):
+    st.session_state[f'{kind}_job_id'] = job_id
+    st.query_params[f'{kind}_job'] = job_id
+
+# --- Result explorer ---
+# Finished results stay on the server in the job's Parquet file. Filtering, sorting and the
+# per-reason counts run on its Arrow table, and only the visible page is converted to pandas
+# and sent to the browser.
+RESULT_FILTER_COLUMNS = ['PL_NAME', 'FET_NAME', 'ANOMALY_REASON', 'VALIDATION_STATUS']
+RESULT_PAGE_SIZES = sorted({25, 50, 100, 250, RESULT_PAGE_SIZE})
+
+@functools.lru_cache(maxsize=8)
+def _load_result_table(path, mtime_ns):
+    import pyarrow.parquet as pq
+    return pq.read_table(path, memory_map=True)
+
+def open_result_table(path):
+    """Return the Arrow table of a job result, cached until the file changes."""
+    return _load_result_table(path, os.stat(path).st_mtime_ns)
+
+def _split_reasons(text):
+    return (text or '').split('; ')
+
+def _value_counts(column):
+    """Return the (value, rows) pairs of an Arrow column."""
+    return [(item['values'], item['counts']) for item in column.value_counts().to_pylist()]
+
+@functools.lru_cache(maxsize=8)
+def _result_filter_options(path, mtime_ns):
+    import pyarrow.compute as pc
+    table = _load_result_table(path, mtime_ns)
+    options = {}
+    for col in RESULT_FILTER_COLUMNS:
+        if col not in table.column_names:
+            continue
+        if col == 'ANOMALY_REASON':
+            # Each reason of a '; '-joined text is offered on its own, in report order
+            present = {reason for text, _ in _value_counts(table.column(col)) for reason in _split_reasons(text)}
+            options[col] = [r for r in ANOMALY_REASONS if r in present] + sorted(present - set(ANOMALY_REASONS))
+        else:
+            options[col] = sorted((v for v in pc.unique(table.column(col)).to_pylist() if v is not None), key=str)
+    return options
+
+def result_filter_options(path):
+    """Return the values the filter columns of a job result can be filtered on."""
+    return _result_filter_options(path, os.stat(path).st_mtime_ns)
+
+@functools.lru_cache(maxsize=32)
+def _filter_result(path, mtime_ns, filters, sort_by, descending):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    table = _load_result_table(path, mtime_ns)
+    mask = None
+    for col, values in filters:
+        if col not in table.column_names:
+            continue
+        if col == 'ANOMALY_REASON':
+            # A row matches when it has any of the chosen reasons; matched once per distinct text
+            wanted = set(values)
+            values = [text for text, _ in _value_counts(table.column(col)) if wanted & set(_split_reasons(text))]
+        col_mask = pc.is_in(table.column(col), value_set=pa.array(values, type=table.schema.field(col).type))
+        mask = col_mask if mask is None else pc.and_(mask, col_mask)
+    if mask is None:
+        indices = np.arange(table.num_rows)
+    else:
+        indices = np.flatnonzero(pc.fill_null(mask, False).to_numpy())
+
+    if sort_by in table.column_names:
+        keys = table.column(sort_by).take(pa.array(indices))
+        order = pc.array_sort_indices(keys, order='descending' if descending else 'ascending', null_placement='at_end')
+        indices = indices[order.to_numpy()]
+
+    # Counts of the matching rows, per single reason and per validation status
+    counts = {}
+    for col in ('ANOMALY_REASON', 'VALIDATION_STATUS'):
+        if col not in table.column_names:
+            continue
+        column = table.column(col).take(pa.array(indices))
+        per_value = {}
+        for text, rows in _value_counts(column):
+            for value in (_split_reasons(text) if col == 'ANOMALY_REASON' else [text]):
+                per_value[value] = per_value.get(value, 0) + rows
+        counts[col] = pd.Series(per_value, name='ROWS', dtype='int64').rename_axis(col).sort_values(ascending=False)
+    indices.setflags(write=False)
+    return indices, counts
+
+def filter_result(path, filters=None, sort_by=None, descending=False):
+    """Return the row numbers of a job result matching `filters`, in display order, and their counts.
+
+    `filters` maps columns of RESULT_FILTER_COLUMNS to the values to keep; ANOMALY_REASON keeps
+    rows that have any of the chosen reasons. Results are cached per file version and query.
+    """
+    filters = tuple(sorted((col, tuple(values)) for col, values in (filters or {}).items() if values))
+    return _filter_result(path, os.stat(path).st_mtime_ns, filters, sort_by, bool(descending))
+
+def result_page(path, indices, page, page_size=RESULT_PAGE_SIZE):
+    """Load one page (0-based) of the rows `indices` of a job result as a DataFrame."""
+    import pyarrow as pa
+    rows = indices[page * page_size:(page + 1) * page_size]
+    frame = _decode_mixed_columns(open_result_table(path).take(pa.array(rows, type=pa.int64())).to_pandas())
+    frame.index = rows
+    return frame
+
+@st.fragment
+def render_result_explorer(job):
+    """Browse a finished job's result page by page, with filters, sorting and per-reason counts."""
+    path = get_job_manager().result_file(job['id'])
+    table = open_result_table(path)
+    key = f"{job['kind']}_explorer"
+
+    options = result_filter_options(path)
+    filters = {}
+    for column, name in zip(st.columns(len(options)), options):
+        with column:
+            filters[name] = st.multiselect(name, options[name], key=f"{key}_{name}")
+
+    sort_col, order_col, size_col = st.columns([2, 1, 1])
+    with sort_col:
+        sortable = [c for c in table.column_names if not c.endswith(_KIND_SUFFIX)]
+        sort_by = st.selectbox("Sort by", ['(report order)'] + sortable, key=f"{key}_sort")
+    with order_col:
+        descending = st.toggle("Descending", key=f"{key}_descending")
+    with size_col:
+        page_size = st.selectbox("Rows per page", RESULT_PAGE_SIZES,
+                                 index=RESULT_PAGE_SIZES.index(RESULT_PAGE_SIZE), key=f"{key}_page_size")
+
+    indices, counts = filter_result(path, filters, None if sort_by == '(report order)' else sort_by, descending)
+    pages = max(1, math.ceil(len(indices) / page_size))
+    # Keep the page number valid when a filter shrinks the result
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+    st.dataframe(result_page(path, indices, page - 1, page_size), use_container_width=True)
+    first = min((page - 1) * page_size + 1, len(indices))
+    last = min(page * page_size, len(indices))
+    st.caption(f"Rows {first:,}-{last:,} of {len(indices):,} matching ({table.num_rows:,} in total)")
+
+    if counts:
+        for column, (name, per_value) in zip(st.columns(len(counts)), counts.items()):
+            with column:
+                st.markdown(f"**Matching rows per {name}**")
+                st.dataframe(per_value, use_container_width=True)
+
+# --- Startup preload ---
+# Streamlit runs the script for the first time when the first browser session connects. A
+# background thread then loads what the first scan or validation would otherwise load on the
+# click: the scikit-learn import, unit rules, approved-anomaly keys, the DB cache and frame,
+# and the per-GROUP statistics. All of them are kept in process-wide caches, so every
+# session benefits and the page does not wait for them.
+def preload_state(db_path=None):
+    """Load the process-wide state the pipelines use and return the seconds each part took."""
+    db_path = db_path or os.path.join(DATA_DIR, DB_FILENAME)
+    approved_file_path = os.path.join(DATA_DIR, APPROVED_FILENAME)
+
+    def load_db():
+        # Streaming mode and DuckDB only need the Parquet cache; use_streaming() refreshes it
+        if use_streaming(db_path):
+            return
+        if use_duckdb():
+            ensure_db_cache(db_path)
+            return
+        load_parametric_db(db_path, columns=DB_COLUMNS)
+
+    parts = [
+        ('scikit-learn import', lambda: __import__('sklearn.ensemble')),
+        ('Unit rules', get_unit_rules),
+        ('Approved anomalies', lambda: get_approved_keys(approved_file_path)),
+        ('DB', load_db),
+        ('DB group statistics', lambda: load_group_stats_index(db_path)),
+    ]
+    timings = {}
+    for name, load in parts:
+        start = time.perf_counter()
+        try:
+            load()
+        except Exception as e:
+            logger.warning("Could not preload %s: %s", name, e)
+        timings[name] = round(time.perf_counter() - start, 4)
+    return timings
+
+@st.cache_resource(show_spinner=False)
+def start_preload():
+    """Run `preload_state` in a daemon thread, once per server process, and return its status."""
+    status = {'state': 'running', 'timings': {}}
+
+    def run():
+        status['timings'] = preload_state()
+        status['state'] = 'done'
+        logger.info("Preloaded startup state in %.2fs: %s", sum(status['timings'].values()), status['timings'])
+    threading.Thread(target=run, name='anomaly-preload', daemon=True).start()
+    return status
+
+def measure_startup(db_path=None, preload=True, upload_rows=200):
+    """Time the preload and the first validation of a small upload in this process.
+
+    Meant for a fresh interpreter (see the `startup` command); without `preload` the
+    validation pays the cold costs itself.
+    """
+    import pyarrow.parquet as pq
+    db_path = db_path or os.path.join(DATA_DIR, DB_FILENAME)
+    ensure_db_cache(db_path)
+    # The upload is a slice of the DB read straight from the cache, which warms nothing
+    cache_file = pq.ParquetFile(_db_cache_paths(db_path)[0])
+    columns = [c for c in cache_file.schema_arrow.names if c in UPLOAD_VALUE_COLUMNS or c[:-len(_KIND_SUFFIX)] in UPLOAD_VALUE_COLUMNS]
+    sample = _decode_mixed_columns(next(cache_file.iter_batches(batch_size=upload_rows * 2, columns=columns)).to_pandas())
+    upload = io.BytesIO(sample.dropna().head(upload_rows).to_csv(index=False).encode('utf-8'))
+
+    result = {'preload': preload_state(db_path) if preload else {}}
+    start = time.perf_counter()
+    validated = validate_uploaded_values(upload, reporter=LogReporter(logging.getLogger('anomaly_qa.startup')), db_path=db_path)
+    result['first_interaction_seconds'] = time.perf_counter() - start
+    result['first_interaction_rows'] = None if validated is None else len(validated)
+    return result
+
 # Streamlit App
 def main():
     st.set_page_config(
@@ -552,6 +2747,9 @@ def main():
         unsafe_allow_html=True
     )
 
+    # Warm the shared state in the background the first time the app runs in this process
+    preload_status = start_preload() if STARTUP_PRELOAD == 'on' else None
+
     # Sidebar
     st.sidebar.header("📋 Tool Information")
     st.sidebar.markdown("""
@@ -564,53 +2762,87 @@ def main():
     
     Choose your analysis method .
     """)
+
+    with st.sidebar.expander("🛠️ Admin"):
+        st.caption("The database is cached in a columnar format and refreshed automatically when the Excel file changes.")
+        if preload_status is not None:
+            if preload_status['state'] == 'done':
+                st.caption(f"Startup preload finished in {sum(preload_status['timings'].values()):.1f}s.")
+            else:
+                st.caption("Startup preload is running...")
+        if st.button("♻️ Rebuild DB cache", key="rebuild_db_cache"):
+            with st.spinner("🔄 Rebuilding database cache..."):
+                try:
+                    rebuilt = build_db_cache(os.path.join(DATA_DIR, DB_FILENAME))
+                    st.success(f"✅ Cache rebuilt with {len(rebuilt)} records.")
+                except Exception as e:
+                    st.error(f"❌ Error rebuilding cache: {str(e)}")
+        if st.button("🧹 Clear result cache", key="clear_result_cache"):
+            get_result_cache().clear()
+            st.success("✅ Result cache cleared.")
+        if st.button("🔁 Reload unit rules", key="reload_unit_rules"):
+            try:
+                rules = reload_unit_rules()
+                st.success(f"✅ Unit rules reloaded: {len(rules['categories'])} categories.")
+            except Exception as e:
+                st.error(f"❌ Error reloading unit rules: {str(e)}")
     
     # Main content
     col1, col2, col3 = st.columns([1, 2, 1])
     
     with col2:
         st.markdown("### 🚀 Analysis Options")
+        report_format = st.selectbox(
+            "📄 Report format",
+            REPORT_FORMATS,
+            format_func=lambda fmt: {'xlsx': 'Excel (.xlsx)', 'csv': 'CSV (.csv)', 'parquet': 'Parquet (.parquet)'}[fmt],
+            key="report_format",
+            help="Format of the downloadable reports. Excel reports larger than 1,048,576 rows continue on extra sheets."
+        )
   
         
         # --- New Section: Validate New Values ---
         st.markdown("#### 🆕 Validate New Values")
         st.markdown(
-            "Upload an Excel file to validate new values against the database. "
+            "Upload an Excel, CSV or Parquet file to validate new values against the database. "
             "**Required columns:** `PL_NAME`, `FET_NAME`, `VALUE`, `MULTIPLIER`, `UNIT`"
         )
 
         new_values_file = st.file_uploader(
-            "Choose an Excel file for new values",
-            type=['xlsx', 'xls'],
+            "Choose an Excel, CSV or Parquet file for new values",
+            type=UPLOAD_FILE_TYPES,
             key="new_values_file",
-            help="Upload Excel file with columns: PL_NAME, FET_NAME, VALUE, UNIT"
+            help="Upload an Excel, CSV or Parquet file with columns: PL_NAME, FET_NAME, VALUE, UNIT"
         )
 
         if new_values_file is not None:
             if st.button("🆕 Validate New Values", type="primary", key="validate_new_values", use_container_width=True):
-                with st.spinner("🔄 Validating new values against database..."):
-                    validation_results = validate_uploaded_values(new_values_file)
-                    
-                    if validation_results is not None and len(validation_results) > 0:
-                        st.markdown("### 📊 Validation Results for New Values")
-                        st.dataframe(validation_results.head(10), use_container_width=True)
-                        
-                        # Download button for results
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        filename = f"New_Values_Validation_{timestamp}.xlsx"
-                        output = io.BytesIO()
-                        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                            validation_results.to_excel(writer, index=False, sheet_name='Validation_Results')
-                        excel_data = output.getvalue()
-                        st.download_button(
-                            label="📥 Download New Values Validation Report (Excel)",
-                            data=excel_data,
-                            file_name=filename,
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                            use_container_width=True
-                        )
-                    else:
-                        st.error("❌ No results to display or validation failed.")
+                _track_job('validate', submit_validation_job(new_values_file, report_format=report_format))
+
+        validation_job = _current_job('validate')
+        if validation_job is not None:
+            if validation_job['status'] in ('queued', 'running'):
+                render_job_progress(validation_job['id'])
+            else:
+                _replay_job_messages(validation_job)
+                render_job_profile(validation_job)
+                if validation_job['status'] == 'done' and validation_job['rows'] > 0:
+                    st.markdown("### 📊 Validation Results for New Values")
+                    render_result_explorer(validation_job)
+
+                    # Download button for results
+                    timestamp = datetime.fromisoformat(validation_job['finished']).strftime("%Y%m%d_%H%M%S")
+                    fmt = validation_job['report_format']
+                    filename = f"New_Values_Validation_{timestamp}.{fmt}"
+                    st.download_button(
+                        label=f"📥 Download New Values Validation Report ({fmt.upper()})",
+                        data=_job_report_bytes(validation_job),
+                        file_name=filename,
+                        mime=REPORT_MIME_TYPES[fmt],
+                        use_container_width=True
+                    )
+                else:
+                    st.error("❌ No results to display or validation failed.")
         
         st.markdown("---")
         
@@ -618,58 +2850,57 @@ def main():
         st.markdown("#### 🗄️ Run Entire Database Analysis")
         st.markdown("Analyze the complete database for anomalies.")
         
+        incremental_scan = st.checkbox(
+            "♻️ Incremental scan (only rescan groups changed since the last run)",
+            key="incremental_scan"
+        )
+
         if st.button("🔧 Run Entire Database", type="primary", use_container_width=True):
-            with st.spinner("🔄 Running anomaly detection... This may take a few minutes."):
-                # Run the anomaly detection
-                anomalies_df = run_anomaly_detection()
-                
-                if anomalies_df is not None and len(anomalies_df) > 0:
-                    # Display summary statistics
+            # The scan runs in the background; identical scans already running are joined
+            _track_job('scan', submit_scan_job(incremental=incremental_scan, report_format=report_format))
+
+        scan_job = _current_job('scan')
+        if scan_job is not None:
+            if scan_job['status'] in ('queued', 'running'):
+                render_job_progress(scan_job['id'])
+            else:
+                _replay_job_messages(scan_job)
+                render_job_profile(scan_job)
+                if scan_job['status'] == 'done' and scan_job['rows'] > 0:
+                    # Summary statistics come from the stored result without loading it into pandas
+                    result_path = get_job_manager().result_file(scan_job['id'])
+                    result_options = result_filter_options(result_path)
                     st.markdown("### 📊 Analysis Results")
                     
                     col_a, col_b, col_c = st.columns(3)
                     with col_a:
-                        st.metric("Total Anomalies", len(anomalies_df))
+                        st.metric("Total Anomalies", open_result_table(result_path).num_rows)
                     with col_b:
-                        st.metric("Unique PL Names", anomalies_df['PL_NAME'].nunique())
+                        st.metric("Unique PL Names", len(result_options['PL_NAME']))
                     with col_c:
-                        st.metric("Unique FET Names", anomalies_df['FET_NAME'].nunique())
+                        st.metric("Unique FET Names", len(result_options['FET_NAME']))
                     
-                    # Show sample of anomalies
-                    st.markdown("### 📋 Sample Anomalies")
-                    st.dataframe(anomalies_df.head(10), use_container_width=True)
+                    # Browse the anomalies page by page
+                    st.markdown("### 📋 Anomalies")
+                    render_result_explorer(scan_job)
                     
                     # Create download button
                     st.markdown("### 💾 Download Results")
                     
                     # Generate timestamp for filename
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"Anomalies_Parametrics_{timestamp}.xlsx"
-                    
-                    # Convert DataFrame to Excel bytes
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        anomalies_df.to_excel(writer, index=False, sheet_name='Anomalies')
-                    
-                    excel_data = output.getvalue()
+                    timestamp = datetime.fromisoformat(scan_job['finished']).strftime("%Y%m%d_%H%M%S")
+                    fmt = scan_job['report_format']
+                    filename = f"Anomalies_Parametrics_{timestamp}.{fmt}"
                     
                     st.download_button(
-                        label="📥 Download Anomalies Report (Excel)",
-                        data=excel_data,
+                        label=f"📥 Download Anomalies Report ({fmt.upper()})",
+                        data=_job_report_bytes(scan_job),
                         file_name=filename,
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        mime=REPORT_MIME_TYPES[fmt],
                         use_container_width=True
                     )
-                    
-                    # Also save to original path for backup
-                    try:
-                        output_path = os.path.join(OUTPUT_DIR, f'Anomalies_Of_parametrics_{timestamp}.xlsx')
-                        anomalies_df.to_excel(output_path, index=False, columns=anomalies_df.columns)
-                        st.success(f"✅ Results also saved to: {output_path}")
-                    except Exception as e:
-                        st.warning(f"⚠️ Could not save to output directory: {str(e)}")
                 
-                elif anomalies_df is not None:
+                elif scan_job['status'] == 'done':
                     st.info("ℹ️ No anomalies detected in the dataset.")
                 else:
                     st.error("❌ Analysis failed. Please check the data source and try again.")
@@ -680,24 +2911,442 @@ def main():
         st.divider()
         st.markdown("#### ✅ Upload Approved Anomaly")
         st.markdown(
-            "Upload an Excel file to add approved anomalies. "
+            "Upload an Excel, CSV or Parquet file to add approved anomalies. "
             "**Required columns:** `PL_NAME`, `FET_NAME`, `VALUE`"
         )
         # Use environment variable for approved_file_path
         approved_file_path = os.path.join(DATA_DIR, APPROVED_FILENAME)
         approved_anomaly_file = st.file_uploader(
-            "Choose an Excel file for approved anomalies",
-            type=['xlsx', 'xls'],
+            "Choose an Excel, CSV or Parquet file for approved anomalies",
+            type=UPLOAD_FILE_TYPES,
             key="approved_anomaly_file",
-            help="Upload Excel file with columns: PL_NAME, FET_NAME, VALUE"
+            help="Upload an Excel, CSV or Parquet file with columns: PL_NAME, FET_NAME, VALUE"
         )
         if approved_anomaly_file is not None:
             if st.button("✅ Upload Approved Anomaly", type="primary", key="upload_approved_anomaly", use_container_width=True):
                 with st.spinner("🔄 Uploading and updating approved anomalies..."):
                     append_approved_anomalies(approved_anomaly_file, approved_file_path)
+        if st.button("📤 Export Approved Anomalies", key="export_approved_anomalies", use_container_width=True):
+            try:
+                output = io.BytesIO()
+                exported = export_approved_anomalies(approved_file_path, output)
+                output.seek(0)
+                st.download_button(
+                    label=f"📥 Download Approved Anomalies ({exported} records)",
+                    data=output,
+                    file_name="Approved_Anomaly_Values_Export.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    use_container_width=True
+                )
+            except Exception as e:
+                st.error(f"❌ Error exporting approved anomalies: {str(e)}")
     # Footer
     st.markdown("---")
     st.markdown("*Powered by Streamlit and Scikit-learn*")
 
+# --- Benchmarks ---
+# `bench` runs the scan and validation stages on synthetic parametric DBs of several sizes and
+# compares the per-stage timings and memory with a stored baseline. All data is generated
+# locally, so it runs offline; results are only compared with a baseline of the same settings.
+GROUP_SIZE_DISTRIBUTIONS = ['lognormal', 'pareto', 'uniform', 'fixed']
+# Stages that take less than this in both runs are too noisy to compare
+BENCH_MIN_SECONDS = 0.05
+_FET_NAME_PREFIXES = ['', 'Maximum ', 'Minimum ', 'Typical ', 'Operating ', 'Rated ']
+_ALLOWED_TEXT_VALUES = ['1 to 5', '10|20', '3/4', 'Min 5', '!5']
+_INVALID_TEXT_VALUES = ['abc', 'TBD', 'n.a.', 'x-y', 'Yes']
+_INVALID_UNIT = 'zz'
+# Progress messages of the benchmarked pipelines; the `bench` command only shows their warnings
+bench_logger = logging.getLogger('anomaly_qa.bench')
+
+def _synthetic_group_sizes(rows, mean_group_size, distribution, rng):
+    """Draw GROUP sizes from `distribution` until they add up to `rows`."""
+    count = max(1, int(2 * rows / mean_group_size) + 10)
+    if distribution == 'lognormal':
+        sizes = rng.lognormal(np.log(mean_group_size) - 0.5, 1.0, count)
+    elif distribution == 'pareto':
+        sizes = 1 + rng.pareto(1.5, count) * mean_group_size / 3
+    elif distribution == 'uniform':
+        sizes = rng.uniform(1, 2 * mean_group_size, count)
+    elif distribution == 'fixed':
+        sizes = np.full(count, mean_group_size)
+    else:
+        raise ValueError(f"Unknown group size distribution: {distribution}")
+    sizes = np.maximum(1, np.round(sizes)).astype(np.int64)
+    while sizes.sum() < rows:
+        sizes = np.concatenate([sizes, sizes])
+    sizes = sizes[:np.searchsorted(np.cumsum(sizes), rows) + 1]
+    sizes[-1] -= sizes.sum() - rows
+    return sizes
+
+def generate_synthetic_db(rows, seed=0, mean_group_size=40, group_sizes='lognormal', fet_names=40,
+                          fets_per_pl=8, non_numeric_ratio=0.1, invalid_unit_ratio=0.03,
+                          outlier_ratio=0.01, missing_ratio=0.02, rules=None):
+    """Generate a parametric DB frame with the DB_COLUMNS layout.
+
+    FET_NAMEs are built from the unit rule categories and get one of their valid units,
+    except for `invalid_unit_ratio` of the rows. Numeric values scatter around a base value
+    per GROUP, `outlier_ratio` of them far off; `non_numeric_ratio` of the values are text
+    (half in an allowed format) and `missing_ratio` of the rows lack a VALUE or UNIT.
+    """
+    rng = np.random.default_rng(seed)
+    rules = rules or get_unit_rules()
+    categories = sorted(key for key, units in rules['categories'].items() if units)
+    fet_pool = [(f"{prefix}{key.title()}", sorted(rules['categories'][key])) for prefix in _FET_NAME_PREFIXES for key in categories]
+    fet_pool = fet_pool[:fet_names]
+    fets_per_pl = min(fets_per_pl, len(fet_pool))
+
+    # GROUPs: every PL_NAME holds `fets_per_pl` consecutive GROUPs with distinct FET_NAMEs
+    sizes = _synthetic_group_sizes(rows, mean_group_size, group_sizes, rng)
+    n_groups = len(sizes)
+    group_pl = np.arange(n_groups) // fets_per_pl
+    n_pl = int(group_pl[-1]) + 1
+    group_fet = (rng.integers(len(fet_pool), size=n_pl)[group_pl] + np.arange(n_groups) % fets_per_pl) % len(fet_pool)
+    row_group = np.repeat(np.arange(n_groups), sizes)
+    row_fet = group_fet[row_group]
+
+    # Numeric values around a base per GROUP, with a share of far outliers
+    base = rng.lognormal(2, 2, n_groups) * rng.choice([-1, 1], n_groups, p=[0.1, 0.9])
+    scale = np.abs(base) * 0.02 + 0.1
+    numbers = base[row_group] + rng.normal(0, 1, rows) * scale[row_group]
+    outliers = rng.random(rows) < outlier_ratio
+    numbers[outliers] = numbers[outliers] * 100 + 1000
+    values = np.round(numbers, 3).astype(object)
+    draw = rng.random(rows)
+    allowed_text = draw < non_numeric_ratio / 2
+    invalid_text = (draw >= non_numeric_ratio / 2) & (draw < non_numeric_ratio)
+    values[allowed_text] = rng.choice(_ALLOWED_TEXT_VALUES, int(allowed_text.sum()))
+    values[invalid_text] = rng.choice(_INVALID_TEXT_VALUES, int(invalid_text.sum()))
+
+    # One of the FET_NAME's valid units per row, then invalid and missing units
+    unit_names = pd.Index([unit for _, units in fet_pool for unit in units] + [_INVALID_UNIT]).unique()
+    fet_unit_codes = [unit_names.get_indexer(units) for _, units in fet_pool]
+    offsets = np.cumsum([0] + [len(codes) for codes in fet_unit_codes])
+    flat_unit_codes = np.concatenate(fet_unit_codes)
+    unit_codes = flat_unit_codes[offsets[row_fet] + (rng.random(rows) * np.diff(offsets)[row_fet]).astype(np.int64)]
+    unit_codes[rng.random(rows) < invalid_unit_ratio] = unit_names.get_loc(_INVALID_UNIT)
+    missing = rng.random(rows) < missing_ratio
+    missing_value = missing & (rng.random(rows) < 0.5)
+    values[missing_value] = np.nan
+    unit_codes[missing & ~missing_value] = -1
+
+    return pd.DataFrame({
+        'PL_NAME': pd.Categorical.from_codes(group_pl[row_group], [f'PL{i:07d}' for i in range(n_pl)]),
+        'FET_NAME': pd.Categorical.from_codes(row_fet, [name for name, _ in fet_pool]),
+        'VALUE_ID': np.arange(1, rows + 1),
+        'VALUE': values,
+        'UNIT': pd.Categorical.from_codes(unit_codes, unit_names),
+    })
+
+def _synthetic_upload(db, rows, seed=0):
+    """Sample upload rows from a synthetic DB, with some unknown PL_NAMEs and out-of-range values."""
+    rng = np.random.default_rng(seed + 1)
+    upload = from_categoricals(db.sample(min(rows, len(db)), random_state=seed).drop(columns=['VALUE_ID']))
+    upload = upload.reset_index(drop=True)
+    draw = rng.random(len(upload))
+    upload.loc[draw < 0.02, 'PL_NAME'] = 'NEW_PL'
+    upload.loc[(draw >= 0.02) & (draw < 0.04), 'VALUE'] = 1e9
+    return upload
+
+def _bench_pipelines(db_path, upload_path, approved_keys):
+    """Run the scan and validation stages once on the prepared files, returning their profiles."""
+    reporter = LogReporter(bench_logger)
+    scan = PipelineProfile('scan', profiler='')
+    with scan.run():
+        with profile_stage('Load DB') as stage:
+            data = read_db_parquet(db_path, DB_COLUMNS)
+            stage['rows_out'] = len(data)
+        with profile_stage('Exclude approved anomalies', rows_in=len(data)) as stage:
+            data = exclude_approved_anomalies(data, approved_keys)
+            stage['rows_out'] = len(data)
+        with profile_stage('Clean', rows_in=len(data)) as stage:
+            data_cleaned = data.dropna().copy()
+            stage['rows_out'] = len(data_cleaned)
+        detect_anomalies(data_cleaned)
+    del data, data_cleaned
+
+    validate = PipelineProfile('validate', profiler='')
+    with validate.run():
+        with profile_stage('Build DB statistics') as stage:
+            db_data = read_db_parquet(db_path, DB_COLUMNS)
+            group_stats = build_group_stats_index(db_data)
+            stage['rows_in'], stage['rows_out'] = len(db_data), len(group_stats)
+        del db_data
+        with profile_stage('Load upload') as stage:
+            uploaded_data = read_uploaded_values(upload_path)
+            stage['rows_out'] = len(uploaded_data)
+        check_uploaded_values(uploaded_data, group_stats, approved_keys, reporter)
+    return [scan, validate]
+
+def _best_of(rows, profiles):
+    """Merge repeated runs of one pipeline: fastest time per stage, highest peak memory."""
+    stages = OrderedDict()
+    for profile in profiles:
+        for record in profile.stages.values():
+            best = stages.setdefault(record['stage'], dict(record))
+            best['seconds'] = min(best['seconds'], record['seconds'])
+            if record['peak_rss_mb'] is not None:
+                best['peak_rss_mb'] = max(best['peak_rss_mb'] or 0, record['peak_rss_mb'])
+    for record in stages.values():
+        work = record['rows_in'] if record['rows_in'] is not None else record['rows_out']
+        record['rows_per_second'] = round(work / record['seconds']) if work and record['seconds'] > 0 else None
+    total_seconds = min(profile.total_seconds for profile in profiles)
+    peaks = [record['peak_rss_mb'] for record in stages.values() if record['peak_rss_mb'] is not None]
+    return {
+        'rows': rows,
+        'pipeline': profiles[0].pipeline,
+        'total_seconds': total_seconds,
+        'rows_per_second': round(rows / total_seconds) if total_seconds > 0 else None,
+        'peak_rss_mb': max(peaks) if peaks else None,
+        'stages': list(stages.values()),
+    }
+
+def run_benchmarks(row_counts, upload_rows=10000, repeat=3, seed=0, reporter=None, **generator_options):
+    """Benchmark both pipelines on synthetic DBs of each size and return the results document."""
+    reporter = get_reporter(reporter)
+    import platform
+    import sklearn
+    settings = {'upload_rows': upload_rows, 'repeat': repeat, 'seed': seed, **generator_options}
+    cases = []
+    with tempfile.TemporaryDirectory(prefix='anomaly-bench-') as tmp_dir:
+        for rows in sorted(row_counts):
+            reporter.info(f"🧪 Generating a synthetic DB of {rows:,} rows...")
+            db = generate_synthetic_db(rows, seed=seed, **generator_options)
+            db_path = os.path.join(tmp_dir, f'db_{rows}.parquet')
+            _encode_mixed_columns(db).to_parquet(db_path, engine='pyarrow', index=False)
+            upload_path = os.path.join(tmp_dir, f'upload_{rows}.xlsx')
+            _synthetic_upload(db, upload_rows, seed).to_excel(upload_path, index=False)
+            approved = db.dropna()
+            approved = approved.sample(min(len(approved), max(10, rows // 1000)), random_state=seed)
+            approved_keys = np.unique(approved_key_hashes(from_categoricals(approved)))
+            del db, approved
+
+            runs = [_bench_pipelines(db_path, upload_path, approved_keys) for _ in range(repeat)]
+            for profiles in zip(*runs):
+                case = _best_of(rows, profiles)
+                cases.append(case)
+                reporter.info(f"⏱️ {case['pipeline']} on {rows:,} rows: {case['total_seconds']:.3f}s "
+                              f"({case['rows_per_second'] or 0:,} rows/s), peak {case['peak_rss_mb']} MB")
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': {
+            'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count(),
+            'pandas': pd.__version__, 'numpy': np.__version__, 'sklearn': sklearn.__version__,
+        },
+        'settings': settings,
+        'cases': cases,
+    }
+
+def compare_benchmarks(results, baseline, tolerance=None):
+    """Return a message for every case, stage or peak memory that regressed beyond `tolerance` against `baseline`."""
+    tolerance = BENCH_TOLERANCE if tolerance is None else tolerance
+    baseline_cases = {(case['rows'], case['pipeline']): case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        base_case = baseline_cases.get((case['rows'], case['pipeline']))
+        if base_case is None:
+            continue
+        label = f"{case['pipeline']} on {case['rows']:,} rows"
+        base_stages = {record['stage']: record for record in base_case['stages']}
+        pairs = [(f'{label}, total', case['total_seconds'], base_case['total_seconds'])]
+        pairs += [(f"{label}, {record['stage']}", record['seconds'], base_stages[record['stage']]['seconds'])
+                  for record in case['stages'] if record['stage'] in base_stages]
+        for name, seconds, base_seconds in pairs:
+            if seconds > base_seconds * (1 + tolerance) and seconds - base_seconds >= BENCH_MIN_SECONDS:
+                regressions.append(f"{name}: {seconds:.3f}s vs {base_seconds:.3f}s baseline (+{100 * (seconds / base_seconds - 1):.0f}%)")
+        if case['peak_rss_mb'] and base_case['peak_rss_mb'] and case['peak_rss_mb'] > base_case['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{label}, peak memory: {case['peak_rss_mb']} MB vs {base_case['peak_rss_mb']} MB baseline")
+    return regressions
+
+# --- Headless command line ---
+# `python "Anomaly_Code&Streamlit_Interface.py" scan --db ... --out ...` runs the same pipelines
+# without a Streamlit server (e.g. from cron), logging progress instead of drawing widgets.
+def _report_target(out, fmt, prefix):
+    """Resolve the --out/--format options to a report path and format."""
+    if out and not os.path.isdir(out):
+        suffix = Path(out).suffix.lstrip('.').lower()
+        return out, fmt or (suffix if suffix in REPORT_FORMATS else 'xlsx')
+    fmt = fmt or 'xlsx'
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(out or OUTPUT_DIR, f'{prefix}_{timestamp}.{fmt}'), fmt
+
+def cli(argv=None):
+    """Run a scan, a validation or a cache rebuild from the command line. Returns the exit code."""
+    parser = argparse.ArgumentParser(
+        prog='anomaly-qa',
+        description='Run the parametric anomaly checks without the Streamlit interface.'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    db_help = 'Parametric DB workbook (default: DATA_DIR/DB_FILENAME)'
+    out_help = 'Report file or directory (default: OUTPUT_DIR with a timestamped name)'
+    format_help = 'Report format (default: taken from --out, otherwise xlsx)'
+
+    scan = commands.add_parser('scan', help='Scan the entire database for anomalies')
+    scan.add_argument('--db', help=db_help)
+    scan.add_argument('--out', help=out_help)
+    scan.add_argument('--format', choices=REPORT_FORMATS, help=format_help)
+    scan.add_argument('--incremental', action='store_true', help='Only rescan groups changed since the last run')
+
+    validate = commands.add_parser('validate', help='Validate new values against the database')
+    validate.add_argument('values', help='Excel, CSV or Parquet file with PL_NAME, FET_NAME, VALUE and UNIT columns')
+    validate.add_argument('--db', help=db_help)
+    validate.add_argument('--out', help=out_help)
+    validate.add_argument('--format', choices=REPORT_FORMATS, help=format_help)
+
+    rebuild = commands.add_parser('rebuild-cache', help='Rebuild the columnar DB cache')
+    rebuild.add_argument('--db', help=db_help)
+
+    bench = commands.add_parser('bench', help='Benchmark the pipelines on synthetic data against a stored baseline')
+    bench.add_argument('--rows', type=int, nargs='+', default=[10000, 50000], help='DB sizes to generate (default: 10000 50000)')
+    bench.add_argument('--upload-rows', type=int, default=10000, help='Rows of the validated upload (default: 10000)')
+    bench.add_argument('--repeat', type=int, default=2, help='Runs per size; the fastest time per stage is kept (default: 2)')
+    bench.add_argument('--seed', type=int, default=0, help='Random seed of the generator (default: 0)')
+    bench.add_argument('--mean-group-size', type=int, default=40, help='Mean rows per GROUP (default: 40)')
+    bench.add_argument('--group-sizes', choices=GROUP_SIZE_DISTRIBUTIONS, default='lognormal', help='GROUP size distribution (default: lognormal)')
+    bench.add_argument('--fet-names', type=int, default=40, help='Distinct FET_NAMEs (default: 40)')
+    bench.add_argument('--fets-per-pl', type=int, default=8, help='GROUPs per PL_NAME (default: 8)')
+    bench.add_argument('--non-numeric-ratio', type=float, default=0.1, help='Share of text values (default: 0.1)')
+    bench.add_argument('--invalid-unit-ratio', type=float, default=0.03, help='Share of invalid units (default: 0.03)')
+    bench.add_argument('--baseline', default=BENCH_BASELINE_FILE, help='Baseline file to compare with (default: BENCH_BASELINE_FILE)')
+    bench.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    bench.add_argument('--tolerance', type=float, default=BENCH_TOLERANCE, help='Tolerated slowdown as a fraction (default: BENCH_TOLERANCE)')
+    bench.add_argument('--out', help='Results file (default: OUTPUT_DIR/bench with a timestamped name)')
+
+    startup = commands.add_parser('startup', help='Measure import time and first-interaction latency against their budgets')
+    startup.add_argument('--db', help=db_help)
+    startup.add_argument('--no-preload', action='store_true', help='Measure the first interaction without the startup preload')
+    startup.add_argument('--upload-rows', type=int, default=200, help='Rows of the first validated upload (default: 200)')
+    startup.add_argument('--out', help='Also save the measurements to this JSON file')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    # Streamlit warns about every widget call made outside a server; those calls are no-ops here
+    from streamlit import config as streamlit_config, logger as streamlit_logger
+    streamlit_config.get_config_options()  # parsing the config resets the log level
+    streamlit_logger.set_log_level('error')
+    reporter = LogReporter()
+
+    if args.command == 'rebuild-cache':
+        try:
+            rebuilt = build_db_cache(args.db or os.path.join(DATA_DIR, DB_FILENAME))
+        except Exception as e:
+            reporter.error(f"❌ Error rebuilding cache: {str(e)}")
+            return 1
+        reporter.success(f"✅ Cache rebuilt with {len(rebuilt)} records.")
+        return 0
+
+    if args.command == 'bench':
+        return bench_command(args, reporter)
+
+    if args.command == 'startup':
+        return startup_command(args, reporter)
+
+    profile = PipelineProfile(args.command)
+    with profile.run():
+        if args.command == 'scan':
+            results = run_anomaly_detection(incremental=args.incremental, reporter=reporter, db_path=args.db)
+            prefix, sheet_name = 'Anomalies_Of_parametrics', 'Anomalies'
+        else:
+            results = validate_uploaded_values(args.values, reporter=reporter, db_path=args.db)
+            prefix, sheet_name = 'New_Values_Validation', 'Validation_Results'
+        if results is None:
+            return 1
+
+        path, fmt = _report_target(args.out, args.format, prefix)
+        try:
+            with profile_stage('Export report', rows_in=len(results)):
+                write_report(results, path, fmt, sheet_name=sheet_name)
+        except Exception as e:
+            reporter.error(f"❌ Could not save results: {str(e)}")
+            return 1
+    reporter.success(f"✅ Results saved to: {path}")
+    for stage in profile.stages.values():
+        reporter.info(f"⏱️ {stage['stage']}: {stage['seconds']:.3f}s")
+    reporter.info(f"⏱️ Profile saved to: {', '.join(profile.write(os.path.splitext(path)[0]))}")
+    return 0
+
+def bench_command(args, reporter):
+    """Run the `bench` subcommand: benchmark, save the results and check them against the baseline."""
+    bench_logger.setLevel(logging.WARNING)
+    results = run_benchmarks(
+        args.rows, upload_rows=args.upload_rows, repeat=args.repeat, seed=args.seed, reporter=reporter,
+        mean_group_size=args.mean_group_size, group_sizes=args.group_sizes, fet_names=args.fet_names,
+        fets_per_pl=args.fets_per_pl, non_numeric_ratio=args.non_numeric_ratio, invalid_unit_ratio=args.invalid_unit_ratio,
+    )
+    out = args.out or os.path.join(OUTPUT_DIR, 'bench', f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    reporter.success(f"✅ Benchmark results saved to: {out}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        reporter.success(f"✅ Baseline saved to: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        reporter.warning(f"⚠️ No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['settings'] != results['settings']:
+        reporter.warning("⚠️ The baseline was recorded with different generator settings; only cases of the same size are compared.")
+    if baseline['machine'] != results['machine']:
+        reporter.warning("⚠️ The baseline was recorded on a different machine or library versions.")
+    regressions = compare_benchmarks(results, baseline, args.tolerance)
+    for message in regressions:
+        reporter.error(f"📉 Regression: {message}")
+    if regressions:
+        return 1
+    reporter.success(f"✅ No regressions against the baseline (tolerance {args.tolerance:.0%}).")
+    return 0
+
+def startup_command(args, reporter):
+    """Run the `startup` subcommand: time a cold import and the first interaction in a fresh interpreter."""
+    # The app is imported in a new interpreter, so nothing is already loaded or cached in memory
+    child = (
+        "import time, json, importlib.util\n"
+        "start = time.perf_counter()\n"
+        "spec = importlib.util.spec_from_file_location('anomaly_qa_app', {script!r})\n"
+        "app = importlib.util.module_from_spec(spec)\n"
+        "spec.loader.exec_module(app)\n"
+        "import_seconds = time.perf_counter() - start\n"
+        "start = time.perf_counter()\n"
+        "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+        "rerun_seconds = time.perf_counter() - start\n"
+        "result = app.measure_startup({db!r}, preload={preload!r}, upload_rows={rows!r})\n"
+        "print(json.dumps(dict(result, import_seconds=import_seconds, rerun_seconds=rerun_seconds)))\n"
+    ).format(script=os.path.abspath(__file__), db=args.db, preload=not args.no_preload, rows=args.upload_rows)
+    completed = subprocess.run([sys.executable, '-c', child], capture_output=True, text=True)
+    if completed.returncode != 0:
+        reporter.error(f"❌ Startup measurement failed: {completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else completed.returncode}")
+        return 1
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['budgets'] = {'import_seconds': STARTUP_IMPORT_BUDGET_S, 'first_interaction_seconds': STARTUP_FIRST_INTERACTION_BUDGET_S}
+
+    reporter.info(f"⏱️ Import: {result['import_seconds']:.3f}s (budget {STARTUP_IMPORT_BUDGET_S:.2f}s)")
+    reporter.info(f"⏱️ Rerun of the script: {result['rerun_seconds']:.3f}s")
+    for name, seconds in result['preload'].items():
+        reporter.info(f"⏱️ Preload {name}: {seconds:.3f}s")
+    reporter.info(f"⏱️ First interaction (validating {result['first_interaction_rows']} rows): "
+                  f"{result['first_interaction_seconds']:.3f}s (budget {STARTUP_FIRST_INTERACTION_BUDGET_S:.2f}s)")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        reporter.success(f"✅ Startup measurements saved to: {args.out}")
+
+    # A budget of 0 is not checked
+    over = [f"{name} took {result[name]:.3f}s, budget {budget:.2f}s"
+            for name, budget in result['budgets'].items() if budget > 0 and result[name] > budget]
+    for message in over:
+        reporter.error(f"📉 Over budget: {message}")
+    if over:
+        return 1
+    reporter.success("✅ Startup is within its budgets.")
+    return 0
+
 if __name__ == "__main__":
-    main()
+    # `streamlit run` serves the app; a plain `python` invocation is the command line
+    if streamlit_is_running():
+        main()
+    else:
+        sys.exit(cli())
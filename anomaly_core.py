@@ -0,0 +1,75 @@
+"""Functions run in worker processes by the Parametric Anomaly QA Tool.
+
+Process pools pickle the function they run by module and name. Streamlit executes the app
+script as a new `__main__` module on every rerun (an empty one for fragment reruns), so a
+function defined in the script cannot be found again while a pool is in use. Everything a
+pool runs therefore lives in this importable module, or is reached through it.
+"""
+import importlib.util
+import sys
+
+import numpy as np
+
+
+def fit_isolation_forest_batch(batch, keep_models=False):
+    """Fit one Isolation Forest per group in a batch.
+
+    Returns the concatenated anomaly masks and, with `keep_models`, the compact model of each group.
+    """
+    # scikit-learn takes about a second to import, so it is only loaded once a forest is fitted
+    from sklearn.ensemble import IsolationForest
+    masks, models = [], []
+    for values in batch:
+        features = values.reshape(-1, 1)
+        iso_forest = IsolationForest(contamination=0.0001, random_state=42)
+        iso_forest.fit(features)
+        masks.append(iso_forest.predict(features) == -1)
+        if keep_models:
+            models.append(compact_isolation_forest(iso_forest))
+    return (np.concatenate(masks) if masks else np.zeros(0, dtype=bool)), models
+
+
+def compact_isolation_forest(iso_forest):
+    """Reduce a fitted one-feature Isolation Forest to (boundaries, labels); labels[i] is True for outliers."""
+    thresholds = np.unique(np.concatenate(
+        [tree.tree_.threshold[tree.tree_.children_left >= 0] for tree in iso_forest.estimators_] + [np.zeros(0)]
+    ))
+    # Trees compare float32 inputs with `value <= threshold`, so interval i is (thresholds[i-1], thresholds[i]]
+    # and is represented by the largest float32 inside it; the last interval by the next float32 up
+    upper = thresholds.astype(np.float32)
+    upper = np.where(upper.astype(np.float64) > thresholds, np.nextafter(upper, np.float32(-np.inf)), upper)
+    last = np.float32(thresholds[-1]) if len(thresholds) else np.float32(0)
+    if len(thresholds) and float(last) <= thresholds[-1]:
+        last = np.nextafter(last, np.float32(np.inf))
+    representatives = np.r_[upper, last].astype(np.float32)
+    # Intervals without any float32 value can never be reached and are merged into the next one
+    reachable = representatives.astype(np.float64) > np.r_[-np.inf, thresholds]
+    reachable[-1] = True
+    boundaries = thresholds[reachable[:-1]]
+    labels = iso_forest.predict(representatives[reachable].reshape(-1, 1)) == -1
+    # Keep only the boundaries where the label changes
+    changes = labels[1:] != labels[:-1]
+    return boundaries[changes], labels[np.r_[True, changes]]
+
+
+# Partitioned scans run the whole detection pipeline in each worker, so the worker imports the
+# app script by path as a regular module (once per process) instead of unpickling its functions.
+_APP_MODULE_NAME = 'anomaly_app_worker'
+_app_modules = {}
+
+
+def load_app(app_path):
+    """Import the app script at `app_path` as a module, once per process."""
+    module = _app_modules.get(app_path)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(_APP_MODULE_NAME, app_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[_APP_MODULE_NAME] = module
+        spec.loader.exec_module(module)
+        _app_modules[app_path] = module
+    return module
+
+
+def detect_shard(app_path, shard, keep_models):
+    """Run the app's detection pipeline on one partition shard in a worker process."""
+    return load_app(app_path)._detect_shard(shard, keep_models)
@@ -0,0 +1,28 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_PATH = Path(__file__).resolve().parents[1] / 'Anomaly_Code&Streamlit_Interface.py'
+
+
+@pytest.fixture(scope='session', autouse=True)
+def app_dirs(tmp_path_factory):
+    """Point the script's data, cache and output directories at a temporary directory."""
+    root = tmp_path_factory.mktemp('app')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('DATA_DIR', str(root / 'data'))
+        mp.setenv('OUTPUT_DIR', str(root / 'output'))
+        mp.setenv('STARTUP_PRELOAD', 'off')
+        yield root
+
+
+@pytest.fixture(scope='session')
+def app(app_dirs):
+    """Import the Streamlit script as a module (its file name is not a valid module name)."""
+    spec = importlib.util.spec_from_file_location('anomaly_app', APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['anomaly_app'] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,50 @@
+"""Hashed approved-anomaly keys must exclude the same rows as the original three-column merge."""
+import numpy as np
+import pandas as pd
+
+
+def merge_exclusion(data, approved):
+    """Original exclusion from run_anomaly_detection."""
+    merged = data.merge(approved, on=['PL_NAME', 'FET_NAME', 'VALUE'], how='left', indicator=True)
+    return merged[merged['_merge'] == 'left_only'].drop(columns=['_merge'])
+
+
+def key_frame(rows):
+    return pd.DataFrame(rows, columns=['PL_NAME', 'FET_NAME', 'VALUE'], dtype=object)
+
+
+DATA = key_frame([
+    ['PL1', 'Voltage', 5], ['PL1', 'Voltage', 5.0], ['PL1', 'Voltage', '5'], ['PL1', 'Voltage', np.int64(5)],
+    ['PL1', 'Current', 5], ['PL2', 'Voltage', 5], ['PL1', 'Voltage', 2.5], ['PL1', 'Voltage', '1 to 5'],
+    ['PL1', 'Voltage', np.nan], ['PL1', 'Voltage', None], ['007', 'Width', 7], ['7', 'Width', 7],
+])
+APPROVED = key_frame([
+    ['PL1', 'Voltage', 5.0], ['PL1', 'Voltage', '1 to 5'], ['PL1', 'Voltage', np.nan], ['007', 'Width', 7],
+])
+
+
+def test_hashed_exclusion_matches_merge(app):
+    data = DATA.set_axis(np.arange(len(DATA)) * 3 + 10)
+    keys = np.sort(app.approved_key_hashes(APPROVED))
+    result = app.exclude_approved_anomalies(data, keys)
+
+    expected = merge_exclusion(data.rename_axis('ROW').reset_index(), APPROVED).set_index('ROW').rename_axis(None)
+    pd.testing.assert_frame_equal(result, expected)
+    # 5 == 5.0 == np.int64(5) and NaN == None, but the text '5' and the PL_NAME '7' are other keys
+    assert result.index.tolist() == [16, 22, 25, 28, 43]
+
+
+def test_keys_round_trip_through_the_store(app, tmp_path):
+    workbook = tmp_path / 'approved.xlsx'
+    APPROVED.to_excel(workbook, index=False)
+    store_path = str(tmp_path / 'approved.sqlite')
+
+    keys = app.get_approved_keys(str(workbook), store_path=store_path)
+    np.testing.assert_array_equal(keys, np.sort(app.approved_key_hashes(APPROVED)))
+    # A second call is served from the cache, a changed workbook is re-imported
+    assert app.get_approved_keys(str(workbook), store_path=store_path) is keys
+    APPROVED.iloc[:2].to_excel(workbook, index=False)
+    np.testing.assert_array_equal(
+        app.get_approved_keys(str(workbook), store_path=store_path),
+        np.sort(app.approved_key_hashes(APPROVED.iloc[:2])),
+    )
@@ -0,0 +1,53 @@
+"""The approved-anomaly store must deduplicate appends, including concurrent ones."""
+import io
+import threading
+
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def store(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'APPROVED_STORE_FILE', str(tmp_path / 'approved.sqlite'))
+    workbook = tmp_path / 'approved.xlsx'
+    pd.DataFrame({'PL_NAME': ['PL1', 'PL1'], 'FET_NAME': ['Voltage', 'Current'], 'VALUE': [5, 'abc']}).to_excel(workbook, index=False)
+    return str(workbook)
+
+
+def upload(rows):
+    buffer = io.BytesIO()
+    pd.DataFrame(rows, columns=['PL_NAME', 'FET_NAME', 'VALUE']).to_excel(buffer, index=False)
+    buffer.seek(0)
+    return buffer
+
+
+def stored_rows(app, store):
+    return sorted(map(tuple, app.load_approved_anomalies(store).astype(str).to_numpy().tolist()))
+
+
+def test_appends_deduplicate_against_the_store(app, store):
+    rows = [['PL1', 'Voltage', 5.0], ['PL2', 'Voltage', 7], ['PL2', 'Voltage', 7]]
+    assert app.append_approved_anomalies(upload(rows), store)
+    assert app.append_approved_anomalies(upload(rows), store)
+    assert stored_rows(app, store) == [('PL1', 'Current', 'abc'), ('PL1', 'Voltage', '5'), ('PL2', 'Voltage', '7')]
+
+    output = io.BytesIO()
+    assert app.export_approved_anomalies(store, output) == 3
+    output.seek(0)
+    assert len(pd.read_excel(output)) == 3
+
+
+def test_concurrent_appends_keep_every_row(app, store):
+    uploads = [upload([['PL9', 'Width', i], ['PL9', 'Width', 100]]) for i in range(8)]
+    threads = [threading.Thread(target=app.append_approved_anomalies, args=(u, store)) for u in uploads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(stored_rows(app, store)) == 2 + 8 + 1
+
+
+def test_app_approvals_survive_a_workbook_reimport(app, store):
+    app.append_approved_anomalies(upload([['PL1', 'Voltage', 5], ['PL3', 'Gain', 1]]), store)
+    pd.DataFrame({'PL_NAME': ['PL4'], 'FET_NAME': ['Gain'], 'VALUE': [2]}).to_excel(store, index=False)
+    assert stored_rows(app, store) == [('PL1', 'Voltage', '5'), ('PL3', 'Gain', '1'), ('PL4', 'Gain', '2')]
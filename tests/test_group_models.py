@@ -0,0 +1,51 @@
+"""Compact GROUP models must predict exactly what the fitted Isolation Forest predicts."""
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+
+GROUPS = {
+    'normal': np.random.default_rng(1).normal(50.0, 2.0, 300),
+    'skewed': np.random.default_rng(2).lognormal(0.0, 1.5, 120),
+    'integers': np.random.default_rng(3).integers(0, 5, 60).astype(float),
+    'constant': np.full(20, 3.3),
+    'tiny': np.array([1e-7, 2e-7, 5e-7, 1.0]),
+}
+
+
+def probe_values(values, boundaries):
+    """Random values around the data plus every boundary and its float32/float64 neighbours."""
+    rng = np.random.default_rng(0)
+    low, high = values.min(), values.max()
+    span = (high - low) or 1.0
+    around = [np.nextafter(boundaries, -np.inf), boundaries, np.nextafter(boundaries, np.inf)]
+    around += [b.astype(np.float32).astype(np.float64) for b in around]
+    return np.concatenate([values, rng.uniform(low - span, high + span, 2000), *around, [-1e30, 1e30]])
+
+
+@pytest.mark.parametrize('name', GROUPS)
+def test_predict_group_model_matches_isolation_forest(app, name):
+    values = GROUPS[name]
+    forest = IsolationForest(contamination=0.0001, random_state=42).fit(values.reshape(-1, 1))
+    boundaries, labels = app.compact_isolation_forest(forest)
+    assert len(labels) == len(boundaries) + 1
+
+    probes = probe_values(values, boundaries)
+    np.testing.assert_array_equal(
+        app.predict_group_model(probes, boundaries, labels),
+        forest.predict(probes.reshape(-1, 1)) == -1,
+    )
+
+
+def test_saved_group_models_load_back(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'GROUP_MODEL_SHARD_GROUPS', 2)
+    codes = np.repeat(np.arange(len(GROUPS)), [len(v) for v in GROUPS.values()])
+    fitted = {}
+    app.score_groups_isolation_forest(np.concatenate(list(GROUPS.values())), codes, workers=1, models=fitted)
+    models = {list(GROUPS)[code]: model for code, model in fitted.items()}
+    app.save_group_models('set', models, store_dir=str(tmp_path))
+
+    loaded = app.open_group_model_set('set', store_dir=str(tmp_path)).load(list(models) + ['missing'])
+    assert loaded.keys() == models.keys()
+    for name, (boundaries, labels) in models.items():
+        np.testing.assert_array_equal(loaded[name][0], boundaries)
+        np.testing.assert_array_equal(loaded[name][1], labels)
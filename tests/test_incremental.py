@@ -0,0 +1,44 @@
+"""Incremental scans must report exactly what a full scan of the same DB reports."""
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def db(app):
+    data = app.generate_synthetic_db(1500, seed=3)
+    return data[app.DB_COLUMNS].dropna()
+
+
+def assert_incremental_matches_full(app, data, state_dir):
+    result, rescanned = app.detect_anomalies_incremental(data.copy(), state_dir=str(state_dir))
+    pd.testing.assert_frame_equal(result, app.detect_anomalies(data.copy()))
+    return rescanned
+
+
+def test_incremental_scan_matches_full_scan_after_edits(app, db, tmp_path):
+    pl_names = db['PL_NAME'].unique()
+    assert assert_incremental_matches_full(app, db, tmp_path) == len(pl_names)
+    assert assert_incremental_matches_full(app, db, tmp_path) == 0
+
+    # Edit one VALUE
+    edited = db.copy()
+    row = edited.index[edited['PL_NAME'] == pl_names[0]][0]
+    edited.loc[row, 'VALUE'] = 1e9
+    assert assert_incremental_matches_full(app, edited, tmp_path) == 1
+
+    # Delete a whole PL_NAME and a single row of another, which shifts every later index
+    deleted = edited[edited['PL_NAME'] != pl_names[1]]
+    deleted = deleted.drop(deleted.index[deleted['PL_NAME'] == pl_names[2]][:1])
+    assert assert_incremental_matches_full(app, deleted, tmp_path) == 2
+
+    # Insert a row into an existing group, in the middle of the DB
+    position = len(deleted) // 2
+    inserted_row = deleted.iloc[[position]].assign(VALUE_ID=db['VALUE_ID'].max() + 1, VALUE=-1e9)
+    inserted = pd.concat([deleted.iloc[:position], inserted_row, deleted.iloc[position:]], ignore_index=True)
+    assert assert_incremental_matches_full(app, inserted, tmp_path) == 1
+
+
+def test_incremental_scan_rescans_everything_when_settings_change(app, db, tmp_path, monkeypatch):
+    assert_incremental_matches_full(app, db, tmp_path)
+    monkeypatch.setattr(app, 'OUTLIER_DETECTOR', 'mad')
+    assert assert_incremental_matches_full(app, db, tmp_path) == db['PL_NAME'].nunique()
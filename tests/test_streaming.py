@@ -0,0 +1,29 @@
+"""Streaming mode must report exactly what the in-memory pipeline reports."""
+import numpy as np
+import pandas as pd
+
+
+def test_streaming_at_tiny_budget_matches_in_memory_run(app, tmp_path, monkeypatch):
+    db = app.generate_synthetic_db(3000, seed=11)
+    db_path = tmp_path / 'db.xlsx'
+    db.to_excel(db_path, index=False)
+    approved_keys = np.sort(app.approved_key_hashes(db.iloc[::50]))
+
+    data = app.exclude_approved_anomalies(app.load_parametric_db(str(db_path), columns=app.DB_COLUMNS), approved_keys)
+    expected = app.detect_anomalies(data.dropna().copy())
+
+    # Inflate the per-row estimate so a 1 MB budget forces several chunks and spill partitions
+    monkeypatch.setattr(app, '_PIPELINE_MEMORY_FACTOR', 100)
+    partitions = []
+    detect_anomalies = app.detect_anomalies
+
+    def detect_partition(part, **kwargs):
+        partitions.append(len(part))
+        return detect_anomalies(part, **kwargs)
+
+    monkeypatch.setattr(app, 'detect_anomalies', detect_partition)
+    result, cleaned_rows = app.detect_anomalies_streaming(str(db_path), approved_keys, memory_budget_mb=1)
+
+    assert len(partitions) > 1
+    assert cleaned_rows == sum(partitions) == len(data.dropna())
+    pd.testing.assert_frame_equal(result, expected)
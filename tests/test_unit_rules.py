@@ -0,0 +1,160 @@
+"""Parity of the vectorized unit validation with the original row-wise check."""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Valid units exactly as they were defined inline in run_anomaly_detection, duplicate keys included
+REFERENCE_VALID_UNITS = {
+    'Current': ['A'],
+    'Voltage': ['V'],
+    'Weight': ['g','lb', 'oz'],
+    'Frequency': ['Hz'],
+    'Resistance': ['Ohm'],
+    'Power': ['W','dB','VA','HP'],
+    'Capacitance': ['F'],
+    'Impedance': ['Ohm'],
+    'Gain': ['dB'],
+    'Thermal': ['c', 'k', '°'] ,
+    'Temperature': ['c', 'k', '°'] ,
+    'Tolerance': ['%','ppm','ppb'] ,
+    'Ratio': ['%'] ,
+    'Efficiency': ['%'] ,
+    'Aging': ['Year','ppm'] ,
+    'Noise': ['db','ppm'] ,
+    'Stability': ['ppm'] ,
+    'Sensitivity': ['db'] ,
+    'Gain Bandwidth': ['Hz'] ,
+    'Breaking Capacity': ['A'] ,
+    'Gain Attenuation': ['dB'] ,
+    'Loss': ['dB'],
+    'Mean Spherical Candle Power': ['MSCP'],
+    'Minimum Isolation Voltage' : ['db'] , 
+      'Current': ['A'], 'Voltage': ['V'], 'Weight': ['g','lb', 'oz'], 'Frequency': ['Hz'],
+    'Resistance': ['Ohm'], 'Power': ['W','dB','VA','HP'], 'Capacitance': ['F'], 'Impedance': ['Ohm'],
+    'Gain': ['dB'], 'Thermal': ['c', 'k', '°'], 'Temperature': ['c', 'k', '°'],
+    'Tolerance': ['%','ppm','ppb'], 'Ratio': ['%'], 'Efficiency': ['%'], 'Aging': ['Year','ppm'],
+    'Noise': ['db','ppm'], 'Stability': ['ppm'], 'Sensitivity': ['db'], 'Gain Bandwidth': ['Hz'],
+    'Breaking Capacity': ['A'], 'Gain Attenuation': ['dB'], 'Loss': ['dB'], 'Mean Spherical Candle Power': ['MSCP'],
+    'Minimum Isolation Voltage' : ['db'] ,
+    'time' : ['s','min','h','ns','d','month','year',''],
+    'color': [''],
+    'depth': ['m','cm','mm','in','ft','mile'],
+    'height' : ['m','cm','mm','in','ft','mile'],
+    'length' : ['m','cm','mm','in','ft','mile'],
+    'size' : ['m','cm','mm','in','gallon','AWG','b','B','bit','byte','oz','word','pixel','cc','ounce'],
+    'Rate' : [    'bps', 'sps', 'N/mm', 'Hz', 'V/us', 'SCFM|GPH', 'r/min', 'bE', 'lbs/in', 'N.mm/deg', 'WPS', 'L/min', 'Bd', 'fps', 'Gbps', 'lb/in', 'L/sec', 'm³/h', 'gpm', 'slm', 'slpm', 
+    'sccm', 'g', 'SPS', 'm/s', 'ft/min', 'scfh', 'Grms', 'ft²/min', 
+    'Gs', 's', '', 'Tps', 'baud', 'CFM', 'rpm'] ,
+    'Material': ['','  '],
+    'Diameter' : ['m','cm','mm','in','ft','mile'],
+    'speed' : ['m/s','km/h','mph','hz','kph','rpm','pbs','rps','cm/s','ft/s','G','Sec','bps'],
+    'width' : ['m','cm','mm','in','ft','mile','°','pbs','hz'],
+    'dimension' : ['m'],
+    'thickness' : ['m','in'],
+    'mounting' : ['m','in',''],
+    'Coefficient' : ['%'],
+    'noise': ['dB','db','ppm','%'],
+    'gender': [''],
+    'Supported Device' :['','  '],
+    'area' : ['m2','cm2','mm2','inch2','ft2','acre'],
+    'volume' : ['m3','cm3','mm3','inch3','ft3','liter'],
+    'pressure' : ['Pa','kPa','MPa','bar','psi'],
+    'energy' : ['J','kJ','cal','Wh','kWh'],
+    'power' : ['W','kW','MW'],
+    'torque' : ['Nm','lb-ft','kg-m'],
+    'force' : ['N','kN','lb','kg'],
+    'acceleration' : ['m/s2','g'],
+    'density' : ['kg/m3','g/cm3','lb/in3'] ,
+    'type': ['','°','bit',' '],
+    'Bandwidth' : ['Hz','bps'],
+    'number' : ['','Turns','key','byte','b',' ']
+}
+
+
+def is_valid_unit(unit, fet_name):
+    """Original row-wise unit check, kept as the reference for find_invalid_units."""
+    if pd.isna(unit):  # Handle missing units
+        return False
+    unit_parts = str(unit).lower().split('|')  # Split compound units
+    unit_valid = False
+    for part in unit_parts:
+        part = part.strip()  # Clean whitespace
+        for key, units in REFERENCE_VALID_UNITS.items():
+            if key.lower() in str(fet_name).lower():  # Match FET_NAME to valid unit types
+                if any(valid_unit.lower() in part for valid_unit in units):
+                    unit_valid = True
+                    break  # Stop checking once a match is found
+    return unit_valid
+
+
+def reference_invalid_units(df):
+    return ~df.apply(lambda row: is_valid_unit(row['UNIT'], row['FET_NAME']), axis=1).astype(bool)
+
+
+@pytest.fixture(params=['rules_file', 'reference_dict'])
+def rules(request, app):
+    """The shipped rules file and the original inline dict must both give the original results."""
+    if request.param == 'rules_file':
+        return app.load_unit_rules()
+    return app.compile_unit_rules(REFERENCE_VALID_UNITS)
+
+
+def assert_parity(app, rules, rows):
+    df = pd.DataFrame(rows, columns=['FET_NAME', 'UNIT'])
+    df.index = df.index * 3 + 7  # Non-default index: results must align with the input rows
+    expected = reference_invalid_units(df)
+    result = app.find_invalid_units(df, 'UNIT', 'FET_NAME', rules)
+    assert result.dtype == bool
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+
+EDGE_CASES = [
+    # Empty and blank units: only valid for categories that allow ''
+    ('Rise Time', ''), ('Color', ''), ('Voltage', ''), ('Material', ' '), ('Current', '  '),
+    # Compound units, valid if any part is valid
+    ('Flow Rate', 'SCFM|GPH'), ('Flow Rate', 'scfm'), ('Voltage', 'x|V'), ('Voltage', 'x | y'),
+    ('Voltage', '|'), ('Voltage', 'V|'), ('Weight', ' lb | kg '), ('Current', 'mA|'),
+    # Missing units are always invalid, even where '' is allowed
+    ('Rise Time', None), ('Rise Time', np.nan), ('Voltage', None), ('Color', np.nan),
+    # Keys that differ only in case ('Noise'/'noise', 'Power'/'power')
+    ('Noise Figure', '%'), ('noise floor', 'ppm'), ('NOISE', 'dB'), ('Output Power', 'kW'),
+    ('power', 'HP'), ('POWER', 'MW'), ('Power Dissipation', 'x'),
+    # Category keys that are substrings of other keys or of FET_NAMEs
+    ('Gain Bandwidth', 'Hz'), ('Gain Bandwidth', 'dB'), ('Gain Attenuation', 'dB'),
+    ('Sample Rate', 'sps'), ('Connector Type', 'bit'), ('Lifetime', 'h'), ('Surface Area', 'mm2'),
+    ('Breaking Capacity', 'A'), ('Wire Size', 'AWG'), ('Thermal Resistance', 'Ohm'),
+    ('Minimum Isolation Voltage', 'V'), ('Minimum Isolation Voltage', 'db'),
+    # FET_NAMEs matching no category, and non-text cells
+    ('Manufacturer', 'V'), ('Manufacturer', ''), (None, 'V'), (np.nan, ''), (12, 'A'),
+    ('Voltage', 5), ('Current', 1.5), ('Voltage', 'v'), ('Frequency', 'kHz'),
+]
+
+
+def test_find_invalid_units_matches_reference_on_edge_cases(app, rules):
+    assert_parity(app, rules, EDGE_CASES)
+
+
+def test_find_invalid_units_matches_reference_on_random_pairs(app, rules):
+    rng = random.Random(20250601)
+    units = sorted({unit for allowed in REFERENCE_VALID_UNITS.values() for unit in allowed})
+    units += ['x', 'zz', 'n m', 'mA', 'kHz', 'DB', 'Ohms', '°C', ' ']
+    fet_names = list(REFERENCE_VALID_UNITS) + [
+        'Maximum Current', 'Supply Voltage', 'Noise Figure', 'POWER out', 'Rate of Time',
+        'Operating Temperature', 'Package Type', 'Manufacturer', None, np.nan, 12,
+    ]
+    rows = []
+    for _ in range(5000):
+        unit = rng.choice(units + [None, np.nan, 5, 1.5])
+        if isinstance(unit, str) and rng.random() < 0.4:
+            unit = unit + rng.choice(['|', ' | ', '|  ']) + rng.choice(units)
+        elif isinstance(unit, str) and rng.random() < 0.3:
+            unit = rng.choice([unit.upper(), unit.title(), f' {unit} '])
+        rows.append((rng.choice(fet_names), unit))
+    assert_parity(app, rules, rows)
+
+
+def test_find_invalid_units_handles_empty_frame(app, rules):
+    df = pd.DataFrame({'FET_NAME': pd.Series([], dtype=object), 'UNIT': pd.Series([], dtype=object)})
+    assert app.find_invalid_units(df, 'UNIT', 'FET_NAME', rules).empty
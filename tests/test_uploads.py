@@ -0,0 +1,50 @@
+"""CSV and Parquet uploads must read like the Excel upload of the same rows."""
+import io
+
+import pandas as pd
+import pytest
+
+ROWS = pd.DataFrame({
+    'PL_NAME': ['007', 'PL1', 'PL1', 'PL1', '1e3', 'PL2'],
+    'FET_NAME': ['Width', 'Voltage', 'Voltage', 'Voltage', 'Gain', '5'],
+    'VALUE': [5, 2.5, '1 to 5', 'abc', -3, 1e-3],
+    'UNIT': ['mm', 'V', 'V', '010', 'dB', 'Ohm'],
+    'EXTRA': [1, 2, 3, 4, 5, 6],
+})
+
+
+def as_upload(fmt):
+    buffer = io.BytesIO()
+    if fmt == 'csv':
+        buffer.write(ROWS.to_csv(index=False).encode('utf-8'))
+    elif fmt == 'parquet':
+        ROWS.astype({'VALUE': str}).to_parquet(buffer, index=False)
+    else:
+        ROWS.to_excel(buffer, index=False)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize('fmt', ['xlsx', 'csv', 'parquet'])
+def test_upload_kind_is_detected_from_content(app, fmt, tmp_path):
+    assert app._upload_kind(as_upload(fmt)) == fmt
+    # The file name does not matter
+    path = tmp_path / 'upload.txt'
+    path.write_bytes(as_upload(fmt).getvalue())
+    assert app._upload_kind(str(path)) == fmt
+    assert app.read_upload_columns(str(path)) == list(ROWS.columns)
+
+
+def test_csv_upload_keeps_name_and_unit_columns_as_text(app):
+    csv = app.read_uploaded_values(as_upload('csv'))
+    assert list(csv.columns) == app.UPLOAD_VALUE_COLUMNS
+    assert csv['PL_NAME'].tolist() == ['007', 'PL1', 'PL1', 'PL1', '1e3', 'PL2']
+    assert csv['FET_NAME'].tolist()[-1] == '5'
+    assert csv['UNIT'].tolist() == ['mm', 'V', 'V', '010', 'dB', 'Ohm']
+
+
+def test_csv_upload_values_match_excel_upload(app):
+    csv = app.read_uploaded_values(as_upload('csv'))
+    excel = app.read_uploaded_values(as_upload('xlsx'))
+    pd.testing.assert_frame_equal(csv.drop(columns='VALUE'), excel.drop(columns='VALUE'))
+    assert [(type(v), v) for v in csv['VALUE']] == [(type(v), v) for v in excel['VALUE']]
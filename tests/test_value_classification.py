@@ -0,0 +1,80 @@
+"""Golden test of classify_values against the original per-cell VALUE checks."""
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def custom_majority_check(value):
+    """Original majority check from both pipelines."""
+    if pd.notna(value) and any(sub in str(value) for sub in ['|', '/', 'to', '!', ' '] ):
+        return True  # Treat as numeric for majority/minority calculation
+    return pd.notna(pd.to_numeric(value, errors='coerce'))
+
+
+def is_non_numeric_anomaly(value):
+    """Original format check from run_anomaly_detection."""
+    if pd.notna(value):
+        if any(char in str(value) for char in ['|', '/', 'to', '!', ' ','!!'] ):
+            return False
+        try:
+            float(value)
+            return False
+        except ValueError:
+            return True
+    return True
+
+
+# Mixed-type VALUE cells as they come out of the workbook and uploads
+GOLDEN_VALUES = [
+    5, 0, -3, np.int64(7), 2.5, -0.001, np.float64(1e6), np.nan, None, True,
+    '5', ' 5', '5.0', '-2', '1e3', '1|2', '3/4', '3 to 4', 'top', '!5', '!!', 'N/A', '  ',
+    'inf', '-inf', 'nan', 'NaN', '1_000', '1,000', 'abc', '5V', '',
+    dt.datetime(2025, 6, 1, 8, 30), pd.Timestamp('2025-06-01'),
+]
+
+# Cells the original format check crashed on (float() raised TypeError). classify_values
+# deliberately reports them as non-numeric anomalies instead.
+CHANGED_VALUES = [dt.date(2025, 6, 1), dt.time(12, 30)]
+
+
+def golden_column(values):
+    """Repeat and shuffle the cells so the factorize broadcast is exercised, on a non-default index."""
+    cells = list(values) * 3
+    order = np.random.default_rng(7).permutation(len(cells))
+    return pd.Series([cells[i] for i in order], index=np.arange(len(cells)) * 2 + 100, dtype=object)
+
+
+def test_classify_values_matches_original_checks(app):
+    values = golden_column(GOLDEN_VALUES)
+    result = app.classify_values(values)
+
+    value_numeric = pd.to_numeric(values, errors='coerce')
+    pd.testing.assert_series_equal(result['VALUE_NUMERIC'], value_numeric, check_names=False)
+    pd.testing.assert_series_equal(result['is_numeric'], value_numeric.notna(), check_names=False)
+    expected_majority = values.apply(custom_majority_check).astype(bool)
+    pd.testing.assert_series_equal(result['is_numeric_majority'], expected_majority, check_names=False)
+    expected_anomaly = values.apply(is_non_numeric_anomaly).astype(bool)
+    pd.testing.assert_series_equal(result['NON_NUMERIC_ANOMALY'], expected_anomaly, check_names=False)
+
+
+def test_classify_values_golden_set_covers_both_outcomes(app):
+    result = app.classify_values(pd.Series(GOLDEN_VALUES, dtype=object))
+    assert result['is_numeric_majority'].any() and not result['is_numeric_majority'].all()
+    assert result['NON_NUMERIC_ANOMALY'].any() and not result['NON_NUMERIC_ANOMALY'].all()
+
+
+@pytest.mark.parametrize('value', CHANGED_VALUES, ids=['date', 'time'])
+def test_classify_values_flags_bare_dates_and_times_as_anomalies(app, value):
+    with pytest.raises(TypeError):
+        is_non_numeric_anomaly(value)
+    assert not custom_majority_check(value)
+
+    values = golden_column(GOLDEN_VALUES + [value])
+    rows = app.classify_values(values)[[cell is value for cell in values]]
+    assert len(rows) == 3
+    assert rows['VALUE_NUMERIC'].isna().all()
+    assert not rows['is_numeric'].any()
+    assert not rows['is_numeric_majority'].any()
+    assert rows['NON_NUMERIC_ANOMALY'].all()
@@ -0,0 +1,51 @@
+"""Process pools must keep working while Streamlit replaces the script's `__main__` module."""
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import APP_PATH
+
+
+@pytest.fixture
+def streamlit_main(monkeypatch):
+    """Execute the script the way Streamlit does: as the body of a fresh `__main__` module."""
+    source = APP_PATH.read_text(encoding='utf-8')
+    body = source.split('\nif __name__ == "__main__":')[0]
+    module = types.ModuleType('__main__')
+    module.__file__ = str(APP_PATH)
+    monkeypatch.setitem(sys.modules, '__main__', module)
+    exec(compile(body, str(APP_PATH), 'exec'), module.__dict__)
+    return module
+
+
+def fragment_rerun(monkeypatch):
+    """A fragment rerun (e.g. the job progress poll) installs an empty `__main__` module."""
+    monkeypatch.setitem(sys.modules, '__main__', types.ModuleType('__main__'))
+
+
+def test_isolation_forest_pool_survives_fragment_rerun(streamlit_main, monkeypatch):
+    rng = np.random.default_rng(0)
+    codes = np.repeat(np.arange(6), 40)
+    values = rng.normal(codes * 10.0, 1.0)
+    values[::37] += 50
+    expected_models = {}
+    expected = streamlit_main.score_groups_isolation_forest(values, codes, workers=1, batch_rows=40, models=expected_models)
+
+    fragment_rerun(monkeypatch)
+    models = {}
+    result = streamlit_main.score_groups_isolation_forest(values, codes, workers=2, batch_rows=40, models=models)
+    np.testing.assert_array_equal(result, expected)
+    assert models.keys() == expected_models.keys()
+
+
+def test_partitioned_scan_survives_fragment_rerun(streamlit_main, monkeypatch):
+    db = streamlit_main.generate_synthetic_db(1500, seed=5)
+    clean = db[streamlit_main.DB_COLUMNS].dropna()
+    expected = streamlit_main.detect_anomalies(clean.copy(), if_workers=1)
+
+    fragment_rerun(monkeypatch)
+    result = streamlit_main.detect_anomalies_partitioned(clean.copy(), backend='processes', workers=2, shards=3)
+    pd.testing.assert_frame_equal(result, expected)